@@ -0,0 +1,103 @@
+import argparse
+import random
+import time
+
+import pygame
+
+import game_test as game
+from distance_field import DistanceField
+from path_cache import PathCache
+
+STEPS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+
+def run(dirty, frames, seed):
+    """用游戏里的图层、玩家、怪物、火球、粒子和 HUD 不限帧率地跑 frames 帧，返回统计信息
+
+    玩家在迷宫里随机走、每半秒发一个火球，怪物照常追玩家；两种模式用同一个种子，画面一样。
+    """
+    random.seed(seed)
+    maze, start_pos, end_pos, doors, keys = game.generate_maze_dfs()
+    game.maze = maze
+    game.distance_field = DistanceField(maze)
+    game.path_cache = PathCache(game.create_pathfinder(maze, end_pos))
+    player = game.player = game.Player(*start_pos)
+    monsters = game.create_monsters(maze, start_pos)
+    maze_layer = game.MazeLayer(maze, keys)
+    renderer = game.DirtyRenderer(dirty)
+    effects = game.effects
+    effects.clear()
+    screen = game.screen
+    font = pygame.font.Font(None, 36)
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    for frame in range(frames):
+        pygame.event.pump()
+        time_passed = frame / 60
+
+        dx, dy = random.choice(STEPS)
+        if player.move_cooldown <= 0 and maze.get(player.x + dx, player.y + dy) in (0, 2):
+            player.x += dx
+            player.y += dy
+        player.update(dx, dy)
+        if frame % 30 == 0:
+            player.shoot_fireball(1 if player.facing_right else -1, 0)
+        for monster in monsters:
+            monster.update(player.x, player.y, maze)
+
+        # 和 main_game 一样的画法
+        renderer.begin(screen, maze_layer.background(time_passed))
+        renderer.mark_all(maze_layer.draw_keys(screen, time_passed))
+        player.draw(screen, player.x, player.y)
+        renderer.mark(game.cell_rect(player.x, player.y, game.CELL_SIZE))
+        renderer.mark(screen.blit(game.apple_img, (end_pos[0] * game.CELL_SIZE + 2,
+                                                   end_pos[1] * game.CELL_SIZE + 2)))
+        for row, text in enumerate((f'Time: {90 - frame // 60}s', f'Keys: {player.keys}',
+                                    f'Moves: {frame // 6}')):
+            renderer.mark(screen.blit(font.render(text, True, game.BLACK), (10, 10 + row * 30)))
+        for monster in monsters:
+            monster.draw(screen)
+            renderer.mark(game.cell_rect(monster.x, monster.y, game.CELL_SIZE // 2))
+        for fireball in player.fireballs[:]:
+            fireball.update()
+            fireball.draw(screen)
+            renderer.mark(fireball.rect())
+            fx, fy = fireball.get_grid_position()
+            if not (0 <= fx < maze.width and 0 <= fy < maze.height) or maze.get(fx, fy) == 1:
+                player.fireballs.remove(fireball)
+        effects.update()
+        effects.draw(screen)
+        renderer.mark_all(effects.dirty_rects(game.CELL_SIZE))
+        renderer.present(screen)
+
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    stats = renderer.stats()
+    return {
+        "fps": frames / elapsed if elapsed > 0 else 0,
+        "cpu_ms": cpu / frames * 1000,
+        "pixels": stats["pixels_per_frame"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较整屏刷新和脏矩形刷新的帧率和 CPU 占用")
+    parser.add_argument("-n", "--frames", type=int, default=1200, help="每种模式跑的帧数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（两种模式用同一个）")
+    args = parser.parse_args()
+
+    total = game.WINDOW_WIDTH * game.WINDOW_HEIGHT
+    results = {}
+    for name, dirty in (("整屏 flip", False), ("脏矩形", True)):
+        results[name] = stats = run(dirty, args.frames, args.seed)
+        print(f"{name}: {stats['fps']:.0f} 帧/秒，每帧 CPU {stats['cpu_ms']:.2f} 毫秒，"
+              f"每帧提交 {stats['pixels'] / total:.0%} 的像素")
+    full, dirty = results["整屏 flip"], results["脏矩形"]
+    if full["cpu_ms"] > 0:
+        print(f"脏矩形每帧 CPU 时间是整屏的 {dirty['cpu_ms'] / full['cpu_ms']:.0%}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,9 @@ import subprocess
 import sys
 import shutil
 
+# 游戏主程序依赖的模块，需要和 main.py 放在一起
+GAME_MODULES = ["maze_gen.py", "maze_grid.py", "maze_level.py", "level_pack.py", "maze_solver.py", "distance_field.py", "corridor_graph.py", "hpa_star.py", "path_cache.py", "route_planner.py", "entity_store.py", "particle_budget.py", "dirty_renderer.py"]
+
 def install_requirements():
     """安装必要的依赖"""
     print("正在安装网页构建工具...")
@@ -18,6 +21,8 @@ def build_web():
     
     # 复制游戏文件到web目录
     shutil.copy("game_test.py", "web/main.py")
+    for module in GAME_MODULES:
+        shutil.copy(module, os.path.join("web", module))
     if os.path.exists("web/resources"):
         shutil.rmtree("web/resources")
     shutil.copytree("resources", "web/resources")
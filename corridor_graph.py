@@ -0,0 +1,276 @@
+from heapq import heappop, heappush
+
+import numpy as np
+
+from maze_gen import WALL, KEY, DOOR
+
+
+class CorridorGraph:
+    """把迷宫压缩成路口图：节点是岔路口、死胡同、钥匙、门和指定的格子（如终点），
+    边是节点之间的一条走廊，记录走廊的长度和经过的格子
+
+    完美迷宫大部分是一格宽的走廊，所以节点数比格子数少一个数量级，
+    长距离的寻路和距离查询在这张图上搜索要快得多。
+    没打开的门也是节点，但搜索时不能进入；开门或者墙变成通道时用 open_cell() 局部更新。
+    内部的格子下标都是四周补了一圈墙之后的扁平下标。
+    """
+
+    def __init__(self, maze, points=()):
+        self.width = maze.width
+        self.height = maze.height
+        self.stride = stride = maze.width + 2
+        cells = maze.cells
+        walk = np.pad(cells != WALL, 1)
+        self.walk = bytearray(walk.tobytes())  # 门也算，这样走廊会在门前断开
+        size = len(self.walk)
+
+        self._node_of = [-1] * size  # 格子 -> 节点编号
+        self._edge_of = [-1] * size  # 走廊里的格子 -> 边编号
+        self._offset = [0] * size  # 走廊里的格子在边上的位置
+        self.node_cell = []  # 节点编号 -> 格子
+        self.adjacent = []  # 节点编号 -> [(相邻节点, 边编号), ...]
+        self.edges = []  # 边编号 -> (节点 a, 节点 b, 从 a 到 b 经过的格子)，删除的边是 None
+        self.closed = set()  # 没打开的门
+        self.searched = 0  # 上一次搜索展开的节点数
+        # 搜索用的缓冲区，每个节点一项，整关只分配一次；_seen[node] 等于本次搜索的编号时
+        # _g 和 _parent 里的值才是这次搜索写的，所以两次搜索之间不用清空
+        self._g = []
+        self._parent = []  # 节点 -> (上一个节点, 边编号)，上一个节点是 None 表示从起点直接走过来
+        self._seen = []
+        self._stamp = 0
+
+        # 通道数不等于 2 的格子（岔路口、死胡同）以及钥匙、门和指定的格子都是节点
+        degree = walk[:-2, 1:-1].astype(np.uint8) + walk[2:, 1:-1] + walk[1:-1, :-2] + walk[1:-1, 2:]
+        special = (cells == KEY) | (cells == DOOR)
+        for x, y in points:
+            special[y, x] = True
+        ys, xs = np.nonzero((cells != WALL) & ((degree != 2) | special))
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            self._add_node((y + 1) * stride + x + 1)
+        ys, xs = np.nonzero(cells == DOOR)
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            self.closed.add(self._node_of[(y + 1) * stride + x + 1])
+
+        for node in range(len(self.node_cell)):
+            self._trace_from(node)
+
+        # 没有任何节点的环形走廊：在环上随便放一个节点
+        covered = (np.array(self._node_of) >= 0) | (np.array(self._edge_of) >= 0)
+        for index in np.flatnonzero(walk.reshape(-1) & ~covered).tolist():
+            if self._node_of[index] < 0 and self._edge_of[index] < 0:
+                self._trace_from(self._add_node(index))
+
+    def _add_node(self, index):
+        node = len(self.node_cell)
+        self._node_of[index] = node
+        self.node_cell.append(index)
+        self.adjacent.append([])
+        self._g.append(0)
+        self._parent.append(None)
+        self._seen.append(0)
+        return node
+
+    def _add_edge(self, a, b, cells):
+        edge = len(self.edges)
+        self.edges.append((a, b, cells))
+        for offset, index in enumerate(cells):
+            self._edge_of[index] = edge
+            self._offset[index] = offset
+        self.adjacent[a].append((b, edge))
+        if b != a:
+            self.adjacent[b].append((a, edge))
+
+    def _remove_edge(self, edge):
+        a, b, _ = self.edges[edge]
+        self.edges[edge] = None
+        self.adjacent[a] = [item for item in self.adjacent[a] if item[1] != edge]
+        self.adjacent[b] = [item for item in self.adjacent[b] if item[1] != edge]
+
+    def _trace_from(self, node):
+        """沿着节点的每个方向走到下一个节点，建立还没有建立的边"""
+        stride = self.stride
+        walk = self.walk
+        node_of = self._node_of
+        edge_of = self._edge_of
+        start = self.node_cell[node]
+        for first in (start - stride, start + stride, start - 1, start + 1):
+            if not walk[first]:
+                continue
+            if node_of[first] >= 0:
+                if node_of[first] > node:  # 相邻的两个节点只建一次边
+                    self._add_edge(node, node_of[first], [])
+                continue
+            if edge_of[first] >= 0:
+                continue  # 已经从另一头走过了
+            cells = []
+            previous, current = start, first
+            while node_of[current] < 0:
+                cells.append(current)
+                for following in (current - stride, current + stride, current - 1, current + 1):
+                    if following != previous and walk[following]:
+                        break
+                previous, current = current, following
+            self._add_edge(node, node_of[current], cells)
+
+    def _split(self, index):
+        """把走廊中间的格子变成节点，原来的边拆成两条"""
+        edge = self._edge_of[index]
+        a, b, cells = self.edges[edge]
+        offset = self._offset[index]
+        self._remove_edge(edge)
+        self._edge_of[index] = -1
+        node = self._add_node(index)
+        self._add_edge(a, node, cells[:offset])
+        self._add_edge(node, b, cells[offset + 1:])
+        return node
+
+    def open_cell(self, x, y):
+        """(x, y) 变成了通道（开门、墙被打通），只更新附近的节点和边"""
+        stride = self.stride
+        index = (y + 1) * stride + x + 1
+        node = self._node_of[index]
+        if node >= 0:
+            self.closed.discard(node)  # 门本来就是节点，打开后可以进入
+            return
+        if self.walk[index]:
+            return
+        # 墙变成通道：旁边走廊里的格子多了一个通道，都要变成节点
+        self.walk[index] = 1
+        neighbors = [neighbor for neighbor in (index - stride, index + stride, index - 1, index + 1)
+                     if self.walk[neighbor]]
+        for neighbor in neighbors:
+            if self._node_of[neighbor] < 0:
+                self._split(neighbor)
+        node = self._add_node(index)
+        for neighbor in neighbors:
+            self._add_edge(node, self._node_of[neighbor], [])
+
+    def _anchors(self, index):
+        """格子到所在走廊两端节点的 [(节点, 步数), ...]"""
+        node = self._node_of[index]
+        if node >= 0:
+            return [(node, 0)]
+        edge = self._edge_of[index]
+        if edge < 0:
+            return []
+        a, b, cells = self.edges[edge]
+        offset = self._offset[index]
+        return [(a, offset + 1), (b, len(cells) - offset)]
+
+    def _search(self, start_index, goal_index):
+        """在图上用 A* 搜索，返回 (步数, 到达终点前的节点, 各节点的父节点和边) 或 None
+
+        返回的父节点表是共享的缓冲区，下一次搜索之前用完。
+        """
+        stride = self.stride
+        node_cell = self.node_cell
+        closed = self.closed
+        goal_y, goal_x = divmod(goal_index, stride)
+
+        goal_anchors = {}
+        for node, cost in self._anchors(goal_index):
+            if node not in closed or node_cell[node] == start_index:
+                goal_anchors[node] = min(cost, goal_anchors.get(node, cost))
+        best = None  # (步数, 最后一个节点)
+        # 起点和终点在同一条走廊上时可以直接走过去
+        if start_index == goal_index:
+            best = (0, None)
+        elif self._edge_of[start_index] >= 0 and self._edge_of[start_index] == self._edge_of[goal_index]:
+            best = (abs(self._offset[start_index] - self._offset[goal_index]), None)
+
+        self._stamp += 1
+        stamp = self._stamp
+        g = self._g
+        parent = self._parent
+        seen = self._seen
+        heap = []
+        for node, cost in self._anchors(start_index):
+            if (node not in closed or cost == 0) and (seen[node] != stamp or cost < g[node]):
+                seen[node] = stamp
+                g[node] = cost
+                parent[node] = (None, None)
+                y, x = divmod(node_cell[node], stride)
+                heappush(heap, (cost + abs(x - goal_x) + abs(y - goal_y), cost, node))
+
+        searched = 0
+        while heap:
+            estimate, cost, node = heappop(heap)
+            if best is not None and estimate >= best[0]:
+                break
+            if cost > g[node]:
+                continue
+            searched += 1
+            if node in goal_anchors and (best is None or cost + goal_anchors[node] < best[0]):
+                best = (cost + goal_anchors[node], node)
+            for neighbor, edge in self.adjacent[node]:
+                if neighbor in closed:
+                    continue
+                new_cost = cost + len(self.edges[edge][2]) + 1
+                if seen[neighbor] != stamp or new_cost < g[neighbor]:
+                    seen[neighbor] = stamp
+                    g[neighbor] = new_cost
+                    parent[neighbor] = (node, edge)
+                    y, x = divmod(node_cell[neighbor], stride)
+                    heappush(heap, (new_cost + abs(x - goal_x) + abs(y - goal_y), new_cost, neighbor))
+        self.searched = searched
+        if best is None:
+            return None
+        return best[0], best[1], parent
+
+    def _index(self, pos):
+        return (pos[1] + 1) * self.stride + pos[0] + 1
+
+    def distance(self, start, goal):
+        """start 到 goal 的最少步数（不能穿过墙和没打开的门），走不到时返回 None"""
+        result = self._search(self._index(start), self._index(goal))
+        return None if result is None else result[0]
+
+    def find_path(self, start, goal):
+        """从 start 到 goal 的路径 [(x, y), ...]（包括两端），走不到时返回空列表"""
+        start_index = self._index(start)
+        goal_index = self._index(goal)
+        result = self._search(start_index, goal_index)
+        if result is None:
+            return []
+        _, last, parent = result
+        if last is None:
+            indices = self._between(start_index, goal_index)
+        else:
+            # 从终点往回：终点所在的一段走廊，然后沿着父节点回到起点
+            indices = self._between(self.node_cell[last], goal_index)[::-1]
+            node = last
+            while True:
+                previous, edge = parent[node]
+                if previous is None:
+                    indices += self._between(self.node_cell[node], start_index)[1:]
+                    break
+                indices += self._edge_cells(edge, node)
+                node = previous
+                indices.append(self.node_cell[node])
+            indices.reverse()
+        stride = self.stride
+        return [(index % stride - 1, index // stride - 1) for index in indices]
+
+    def _edge_cells(self, edge, to_node):
+        """边上的格子，按走向 to_node 的反方向排列（从 to_node 往回走）"""
+        a, b, cells = self.edges[edge]
+        return cells[::-1] if b == to_node else list(cells)
+
+    def _between(self, from_index, to_index):
+        """同一条走廊（或走廊一端的节点和走廊里的格子）上两点之间的格子，包括两端"""
+        if from_index == to_index:
+            return [from_index]
+        if self._node_of[to_index] >= 0:
+            if self._node_of[from_index] >= 0:
+                return [from_index, to_index]  # 相邻的两个节点
+            return self._between(to_index, from_index)[::-1]
+        a, b, cells = self.edges[self._edge_of[to_index]]
+        offset = self._offset[to_index]
+        node = self._node_of[from_index]
+        if node >= 0:
+            # 从走廊一端的节点走到走廊里的格子（环形走廊两头是同一个节点，走近的一头）
+            if node == a and (node != b or offset + 1 <= len(cells) - offset):
+                return [from_index] + cells[:offset + 1]
+            return [from_index] + cells[offset:][::-1]
+        i = self._offset[from_index]
+        return cells[i:offset + 1] if i <= offset else cells[offset:i + 1][::-1]
@@ -0,0 +1,73 @@
+import pygame
+
+
+class DirtyRenderer:
+    """脏矩形渲染：只重画、只提交这一帧和上一帧画过东西的地方
+
+    每帧先 begin() 贴背景，画东西时用 mark() 记下画到的范围，最后 present() 提交到屏幕。
+    打开时 begin() 只用背景盖住上一帧画过的地方，present() 用 pygame.display.update(rects)
+    只提交上一帧和这一帧画过的范围；关闭时和原来一样每帧贴整张背景再 flip()。
+    背景换了一张（比如小草摆动）、背景上的格子变了（touch()）或者刚切换模式时自动整屏重画一帧。
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._background = None
+        self._previous = []  # 上一帧画过的范围，这一帧要先用背景盖住
+        self._current = []  # 这一帧画过的范围
+        self._full = True  # 这一帧要整屏重画
+        self.frames = 0
+        self.full_frames = 0
+        self.pixels = 0  # 提交到屏幕的像素总数
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self._full = True
+
+    def invalidate(self):
+        """下一次 present() 整屏提交（画面上有很多东西在动时用）"""
+        self._full = True
+
+    def touch(self, rect):
+        """背景上的 rect 范围变了，这一帧要重画并提交"""
+        self._previous.append(pygame.Rect(rect))
+
+    def begin(self, screen, background):
+        if background is not self._background:
+            self._background = background
+            self._full = True
+        if not self.enabled or self._full:
+            screen.blit(background, (0, 0))
+        else:
+            for rect in self._previous:
+                screen.blit(background, rect, rect)
+
+    def mark(self, rect):
+        """记下这一帧画到的范围（pygame 的 blit() 和 draw 函数返回的 Rect）"""
+        self._current.append(rect)
+
+    def mark_all(self, rects):
+        self._current.extend(rects)
+
+    def present(self, screen):
+        self.frames += 1
+        if not self.enabled or self._full:
+            pygame.display.flip()
+            self.full_frames += 1
+            self.pixels += screen.get_width() * screen.get_height()
+            self._full = False
+        else:
+            bounds = screen.get_rect()
+            rects = [bounds.clip(rect) for rect in self._previous + self._current]
+            pygame.display.update(rects)
+            self.pixels += sum(rect.width * rect.height for rect in rects)
+        self._previous = self._current
+        self._current = []
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "frames": self.frames,
+            "full_frames": self.full_frames,
+            "pixels_per_frame": self.pixels / self.frames if self.frames else 0,
+        }
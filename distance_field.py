@@ -0,0 +1,111 @@
+from collections import deque
+
+import numpy as np
+
+# 默认不能通过的格子：墙和没打开的门（钥匙可以经过）
+BLOCKING = (1, 3)
+
+# 流场里的方向：上、下、左、右，NO_STEP 表示已经到达或走不到
+STEPS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+NO_STEP = 255
+
+
+def distance_map(maze, source, blocking=BLOCKING):
+    """从 source 出发一次 BFS 算出到所有格子的步数，返回形状为 (height, width) 的 int32 数组
+
+    走不到的格子是 -1。
+    """
+    cells = maze.cells
+    stride = maze.width + 2
+    # 四周补一圈墙，BFS 时不用检查边界
+    passable = np.pad(~np.isin(cells, blocking), 1).reshape(-1).tobytes()
+    return _bfs(passable, stride, maze.width, maze.height, source)
+
+
+def _bfs(passable, stride, width, height, source):
+    distance = [-1] * len(passable)
+    start_index = (source[1] + 1) * stride + source[0] + 1
+    if not passable[start_index]:
+        return np.full((height, width), -1, dtype=np.int32)
+    distance[start_index] = 0
+    queue = deque([start_index])
+    while queue:
+        index = queue.popleft()
+        step = distance[index] + 1
+        for neighbor in (index - stride, index + stride, index - 1, index + 1):
+            if passable[neighbor] and distance[neighbor] < 0:
+                distance[neighbor] = step
+                queue.append(neighbor)
+    field = np.array(distance, dtype=np.int32).reshape(height + 2, stride)
+    return field[1:-1, 1:-1]
+
+
+def flow_map(field):
+    """由距离图算出流场：每个格子往起点走一步的方向（STEPS 的下标），返回按行展开的 bytes
+
+    所有要去同一个起点的怪物共用一张流场，每个怪物每步只需要查一次表。
+    """
+    height, width = field.shape
+    padded = np.pad(field, 1, constant_values=-1)
+    flow = np.full(field.shape, NO_STEP, dtype=np.uint8)
+    for direction, (dx, dy) in reversed(list(enumerate(STEPS))):
+        neighbor = padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+        flow[(field > 0) & (neighbor == field - 1)] = direction  # 倒序写入，靠前的方向优先
+    return flow.tobytes()
+
+
+class DistanceField:
+    """按起点缓存的距离图和流场，同一个起点的查询都是 O(1)
+
+    迷宫里能不能通过的格子改变时（开门）要调用 invalidate()；
+    拾取钥匙不影响能不能通过，不需要调用。
+    """
+
+    def __init__(self, maze, blocking=BLOCKING, cache_size=8):
+        self.maze = maze
+        self.blocking = blocking
+        self.cache_size = cache_size
+        self._passable = None
+        self._fields = {}  # 起点 -> 距离图（按使用顺序排列）
+        self._flows = {}  # 起点 -> 流场
+
+    def invalidate(self):
+        self._passable = None
+        self._fields.clear()
+        self._flows.clear()
+
+    def field(self, source):
+        """从 source 出发的距离图，形状为 (height, width)，走不到的格子是 -1"""
+        field = self._fields.pop(source, None)
+        if field is None:
+            maze = self.maze
+            if self._passable is None:
+                self._passable = np.pad(~np.isin(maze.cells, self.blocking), 1).reshape(-1).tobytes()
+            field = _bfs(self._passable, maze.width + 2, maze.width, maze.height, source)
+            if len(self._fields) >= self.cache_size:
+                oldest = next(iter(self._fields))
+                del self._fields[oldest]
+                self._flows.pop(oldest, None)
+        self._fields[source] = field
+        return field
+
+    def distance(self, source, target):
+        """source 到 target 的步数，走不到时返回 None"""
+        distance = int(self.field(source)[target[1], target[0]])
+        return distance if distance >= 0 else None
+
+    def flow(self, source):
+        """去 source 的流场（见 flow_map()），第一次用到时由距离图算出"""
+        flow = self._flows.get(source)
+        if flow is None:
+            flow = self._flows[source] = flow_map(self.field(source))
+        return flow
+
+    def step_toward(self, source, position):
+        """从 position 往 source 走一步的下一个格子（沿距离下降的方向），已经到达或走不到时返回 None"""
+        x, y = position
+        direction = self.flow(source)[y * self.maze.width + x]
+        if direction == NO_STEP:
+            return None
+        dx, dy = STEPS[direction]
+        return x + dx, y + dy
@@ -0,0 +1,192 @@
+import numpy as np
+import pygame
+
+# 实体种类
+PARTICLE = 0  # 普通粒子（怪物、火球的特效）
+ROCKET = 1  # 还没炸开的烟花，往上飞、越飞越慢，速度降到 -1 以上时炸开
+SPARK = 2  # 烟花炸开后的粒子
+TRAIL = 3  # 拖尾粒子（火球），画面卡的时候最先不要
+
+GRAVITY = 0.2  # 粒子每帧增加的向下速度
+ROCKET_BRAKE = 0.5  # 烟花每帧减少的上升速度
+ROCKET_BURST = 50  # 一个烟花炸出的粒子数
+
+
+def _stamp(radius):
+    """pygame.draw.circle 画半径 radius 的圆会涂到的像素，相对圆心的 (dx 数组, dy 数组)"""
+    size = radius * 2 + 3
+    surface = pygame.Surface((size, size))
+    pygame.draw.circle(surface, (255, 255, 255), (radius + 1, radius + 1), radius)
+    xs, ys = np.nonzero(pygame.surfarray.array2d(surface))
+    return (xs - radius - 1).astype(np.int32), (ys - radius - 1).astype(np.int32)
+
+
+class EntityStore:
+    """特效实体的对象池：位置、速度、寿命、颜色、种类各是一个固定长度的 NumPy 数组，下标相同的是同一个实体
+
+    容量在创建时固定，空位放在一个栈里（free list），生成时从栈顶取，死掉时放回去，
+    不会分配新内存，也不用移动活着的实体；池满了以后新生成的实体直接丢掉。
+    每帧用 update() 对整个池做一次向量运算（移动、加速度、寿命），
+    draw() 一次把所有圆点写进 surface 的像素缓冲区，不再每个粒子调用一次 pygame.draw.circle。
+    给了 budget（ParticleBudget）时，生成的数量和寿命按它的细节等级减少。
+    """
+
+    def __init__(self, capacity=4096, budget=None):
+        self.capacity = capacity
+        self.budget = budget
+        self.random = np.random.default_rng()
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.accel = np.zeros(capacity)  # 每帧加到 vy 上的值
+        self.lifetime = np.zeros(capacity, dtype=np.int32)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.kind = np.zeros(capacity, dtype=np.uint8)
+        self.size = np.zeros(capacity, dtype=np.uint8)  # 画圆的半径
+        self.alive = np.zeros(capacity, dtype=bool)
+        self._free = np.arange(capacity - 1, -1, -1, dtype=np.int32)  # 空位栈，前 _free_count 个有效
+        self._free_count = capacity
+        self._stamps = {}  # 半径 -> 圆点的像素偏移
+
+    def __len__(self):
+        return self.capacity - self._free_count
+
+    def clear(self):
+        self.alive[:] = False
+        self._free[:] = np.arange(self.capacity - 1, -1, -1)
+        self._free_count = self.capacity
+
+    def spawn(self, kind, x, y, vx, vy, lifetime, color, accel=GRAVITY, size=2):
+        """生成一批实体，参数可以是标量或长度相同的数组（颜色是 (r, g, b) 或 n x 3 的数组）
+
+        返回实际生成的数量，池满或者细节等级降低时会少于要求的数量。
+        """
+        color = np.asarray(color)
+        count = max(np.size(value) for value in (x, y, vx, vy, lifetime))
+        if color.ndim == 2:
+            count = max(count, len(color))
+        budget = self.budget
+        if budget is not None:
+            if kind == TRAIL and not budget.trails():
+                return 0
+            count = budget.count(count)
+            lifetime = np.maximum(1, np.asarray(lifetime) * budget.lifetime_scale()).astype(np.int32)
+        taken = min(count, self._free_count)
+        if not taken:
+            return 0
+        self._free_count -= taken
+        slots = self._free[self._free_count:self._free_count + taken]
+        for array, value in ((self.x, x), (self.y, y), (self.vx, vx), (self.vy, vy),
+                             (self.lifetime, lifetime)):
+            value = np.asarray(value)
+            array[slots] = value[:taken] if value.ndim else value
+        self.color[slots] = color[:taken] if color.ndim == 2 else color
+        self.accel[slots] = accel
+        self.kind[slots] = kind
+        self.size[slots] = size
+        self.alive[slots] = True
+        return taken
+
+    def _release(self, slots):
+        self.alive[slots] = False
+        self._free[self._free_count:self._free_count + len(slots)] = slots
+        self._free_count += len(slots)
+
+    def burst(self, x, y, count, min_speed, max_speed, lifetime, color, kind=PARTICLE):
+        """从 (x, y) 向四周随机方向炸出 count 个粒子，lifetime 是寿命范围 (最少, 最多)"""
+        angle = self.random.uniform(0, np.pi * 2, count)
+        speed = self.random.uniform(min_speed, max_speed, count)
+        life = self.random.integers(lifetime[0], lifetime[1], count, endpoint=True)
+        return self.spawn(kind, x, y, np.cos(angle) * speed, np.sin(angle) * speed, life, color)
+
+    def launch(self, x, y):
+        """从 (x, y) 发射一个随机颜色的烟花"""
+        color = self.random.integers(50, 255, 3, endpoint=True)
+        speed = self.random.uniform(-15, -10)
+        # 烟花炸开之前不会老死，寿命设成足够大
+        self.spawn(ROCKET, x, y, 0, speed, np.iinfo(np.int32).max, color, accel=ROCKET_BRAKE, size=3)
+
+    def update(self):
+        """所有实体前进一帧：移动、加速、寿命减一，回收死掉的实体，炸开飞到顶的烟花"""
+        if not len(self):
+            return
+        # 空位上的数据没有用，整个池一起算比先挑出活着的实体更快
+        self.x += self.vx
+        self.y += self.vy
+        self.vy += self.accel
+        self.lifetime -= 1
+
+        exploded = np.flatnonzero(self.alive & (self.kind == ROCKET) & (self.vy >= -1))
+        bursts = list(zip(self.x[exploded].tolist(), self.y[exploded].tolist(), self.color[exploded]))
+        self._release(exploded)
+        self._release(np.flatnonzero(self.alive & (self.lifetime <= 0)))
+
+        for x, y, color in bursts:
+            self.burst(x, y, ROCKET_BURST, 3, 8, (30, 60), color, kind=SPARK)
+
+    def dirty_rects(self, grid):
+        """活着的实体所在的 grid x grid 方格（四周扩出圆点半径），脏矩形渲染用"""
+        slots = np.flatnonzero(self.alive)
+        if not len(slots):
+            return []
+        margin = int(self.size[slots].max()) + 1
+        cells = np.unique(np.stack([self.x[slots] // grid, self.y[slots] // grid], axis=1).astype(np.int64), axis=0)
+        return [pygame.Rect(x * grid - margin, y * grid - margin, grid + 2 * margin, grid + 2 * margin)
+                for x, y in cells.tolist()]
+
+    def _circle(self, radius):
+        stamp = self._stamps.get(radius)
+        if stamp is None:
+            stamp = self._stamps[radius] = _stamp(radius)
+        return stamp
+
+    def draw(self, surface):
+        """把所有活着的实体画成圆点，画出来的像素和 pygame.draw.circle 一样"""
+        slots = np.flatnonzero(self.alive)
+        if not len(slots):
+            return
+        width, height = surface.get_size()
+        xs = self.x[slots].astype(np.int64)
+        ys = self.y[slots].astype(np.int64)
+        sizes = self.size[slots]
+        colors = self.color[slots]
+        if surface.get_bytesize() == 4:
+            self._draw_mapped(surface, xs, ys, sizes, colors)
+            return
+        pixels = pygame.surfarray.pixels3d(surface)
+        for radius in np.unique(sizes).tolist():
+            chosen = sizes == radius
+            dx, dy = self._circle(radius)
+            # 每个实体的每个像素，先排成 (实体数, 圆点像素数) 再展平
+            px = (xs[chosen][:, None] + dx).ravel()
+            py = (ys[chosen][:, None] + dy).ravel()
+            inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+            pixels[px[inside], py[inside]] = np.repeat(colors[chosen], len(dx), axis=0)[inside]
+        del pixels  # 释放对 surface 的锁定
+
+    def _draw_mapped(self, surface, xs, ys, sizes, colors):
+        """32 位 surface：颜色先换成像素值，再按一维下标直接写进像素缓冲区"""
+        width, height = surface.get_size()
+        red, green, blue, _ = surface.get_shifts()
+        red_loss, green_loss, blue_loss, _ = surface.get_losses()
+        colors = colors.astype(np.uint32)
+        mapped = (((colors[:, 0] >> red_loss) << red) | ((colors[:, 1] >> green_loss) << green) |
+                  ((colors[:, 2] >> blue_loss) << blue) | surface.get_masks()[3])
+        pitch = surface.get_pitch() // 4
+        view = surface.get_view("1")
+        pixels = np.frombuffer(view, dtype=np.uint32)
+        for radius in np.unique(sizes).tolist():
+            dx, dy = self._circle(radius)
+            chosen = sizes == radius
+            # 离边缘够远的圆点整个都在屏幕里，不用逐个像素检查
+            inner = chosen & (xs >= radius) & (xs < width - radius) & (ys >= radius) & (ys < height - radius)
+            index = (ys[inner] * pitch + xs[inner])[:, None] + (dy * pitch + dx)
+            pixels[index.ravel()] = np.repeat(mapped[inner], len(dx))
+            edge = chosen & ~inner
+            if edge.any():
+                px = (xs[edge][:, None] + dx).ravel()
+                py = (ys[edge][:, None] + dy).ravel()
+                inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+                pixels[py[inside] * pitch + px[inside]] = np.repeat(mapped[edge], len(dx))[inside]
+        del pixels, view  # 释放对 surface 的锁定
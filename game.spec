@@ -7,7 +7,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('resources', 'resources')],
-    hiddenimports=['pygame', 'pathfinding'],
+    hiddenimports=['pygame', 'numpy'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -3,9 +3,18 @@ import sys
 import random
 import math
 import time
-from pathfinding.core.grid import Grid
-from pathfinding.finder.a_star import AStarFinder
-from pathfinding.core.diagonal_movement import DiagonalMovement
+import os
+from maze_grid import MazeGrid, positions
+from maze_level import load_level
+from level_pack import LevelPack
+from distance_field import DistanceField
+from corridor_graph import CorridorGraph
+from hpa_star import HierarchicalPathfinder
+from path_cache import PathCache
+from route_planner import RoutePlanner
+from entity_store import EntityStore, PARTICLE, TRAIL
+from particle_budget import ParticleBudget
+from dirty_renderer import DirtyRenderer
 
 # 初始化Pygame
 pygame.init()
@@ -33,6 +42,20 @@ SILVER_LIGHT = (220, 220, 220)  # 剑的高光
 CELL_SIZE = 30  # 增加格子的大小
 MAZE_WIDTH = 25  # 减少迷宫的宽度，使通道相对更宽
 MAZE_HEIGHT = 17  # 减少迷宫的高度，使通道相对更宽
+# 迷宫生成算法（dfs / kruskal / prim / wilson / eller / binary_tree），可以用环境变量指定
+MAZE_ALGORITHM = os.environ.get("MAZE_ALGORITHM", "dfs")
+# 格子数达到这个数量的大迷宫改用分层寻路（路口图要预先扫描整张迷宫，太慢）；
+# 现在的 25x17 迷宫用不到，只有把迷宫改得很大时才会走这条路（tests/test_hpa_star.py 用小区块测试）
+HPA_MIN_CELLS = 1000 * 1000
+# 怪物数量，可以用环境变量指定（所有怪物共用一张去玩家所在格子的流场）
+MONSTER_COUNT = int(os.environ.get("MAZE_MONSTERS", 1))
+# 当前关卡的随机种子：同一个种子总是得到同一个关卡，通关后换下一个
+level_seed = int(os.environ.get("MAZE_SEED", random.randrange(2 ** 32)))
+# 预生成的关卡包（pack_levels.py 生成）：指定后按 level_seed 作为关卡编号从包里读取关卡
+MAZE_LEVEL_PACK = os.environ.get("MAZE_LEVEL_PACK")
+level_pack = LevelPack(MAZE_LEVEL_PACK) if MAZE_LEVEL_PACK else None
+# 脏矩形渲染（只提交画面上变了的地方），MAZE_DIRTY_RECTS=1 时一开始就打开，游戏中按 F2 切换
+renderer = DirtyRenderer(os.environ.get("MAZE_DIRTY_RECTS") == "1")
 
 # 创建游戏窗口
 WINDOW_WIDTH = MAZE_WIDTH * CELL_SIZE
@@ -60,8 +83,54 @@ except Exception as e:
     monster_sound = pygame.mixer.Sound(bytes(0))
 
 
+SWORD_STEP = 5  # 剑的角度每 5° 事先画一张图
+SWORD_REACH = CELL_SIZE  # 剑的图是以手部为中心、边长 2 * SWORD_REACH 的正方形
+
+
+def draw_sword(surface, sword_base_x, sword_base_y, sword_angle):
+    # 剑柄在 (sword_base_x, sword_base_y)，剑尖指向 sword_angle 度（0° 朝右，逆时针）
+    # 剑的尺寸
+    sword_length = CELL_SIZE * 2 // 3
+    sword_width = 6
+
+    # 计算剑尖的位置
+    angle_rad = math.radians(sword_angle)
+    sword_tip_x = sword_base_x + math.cos(angle_rad) * sword_length
+    sword_tip_y = sword_base_y - math.sin(angle_rad) * sword_length
+
+    # 绘制剑身（带高光效果）
+    pygame.draw.line(surface, SILVER,
+                     (sword_base_x, sword_base_y),
+                     (sword_tip_x, sword_tip_y), sword_width)
+    # 高光效果
+    pygame.draw.line(surface, SILVER_LIGHT,
+                     (sword_base_x + 1, sword_base_y + 1),
+                     (sword_tip_x + 1, sword_tip_y + 1), sword_width // 2)
+
+    # 绘制剑柄
+    handle_length = 12
+    handle_angle = angle_rad + math.pi / 2
+    handle_x = sword_base_x
+    handle_y = sword_base_y
+    pygame.draw.line(surface, BROWN_DARK,
+                     (handle_x - math.cos(handle_angle) * handle_length // 2,
+                      handle_y - math.sin(handle_angle) * handle_length // 2),
+                     (handle_x + math.cos(handle_angle) * handle_length // 2,
+                      handle_y + math.sin(handle_angle) * handle_length // 2),
+                     4)
+
+
+def render_sword(angle):
+    """手部在中心、指向 angle 度的剑的图"""
+    sprite = pygame.Surface((SWORD_REACH * 2, SWORD_REACH * 2), pygame.SRCALPHA)
+    draw_sword(sprite, SWORD_REACH, SWORD_REACH, angle)
+    return sprite
+
+
 # 玩家动画类
 class Player:
+    sprites = None  # 所有玩家共用的动画帧（朝右、朝左）和各个角度的剑
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -83,7 +152,20 @@ class Player:
         self.create_animations()
 
     def create_animations(self):
-        self.frames = []
+        # 所有玩家的动画帧和剑都一样，第一次创建玩家时画好，之后重新开始游戏直接用
+        if Player.sprites is None:
+            frames = self.render_frames()
+            Player.sprites = {
+                "right": frames,
+                "left": [pygame.transform.flip(frame, True, False) for frame in frames],
+                "swords": {angle: render_sword(angle) for angle in range(0, 360, SWORD_STEP)},
+            }
+        self.frames = Player.sprites["right"]
+        self.flipped_frames = Player.sprites["left"]
+        self.swords = Player.sprites["swords"]
+
+    def render_frames(self):
+        frames = []
         for i in range(4):  # 4个动画帧
             frame = pygame.Surface((CELL_SIZE - 4, CELL_SIZE - 4), pygame.SRCALPHA)
 
@@ -242,7 +324,8 @@ class Player:
                                       CELL_SIZE // 2 - flame_height),
                                      2)
 
-            self.frames.append(frame)
+            frames.append(frame)
+        return frames
 
     def update(self, dx, dy):
         # 更新移动状态
@@ -281,11 +364,9 @@ class Player:
                 self.fireballs.remove(fireball)
 
     def draw(self, screen, x, y):
-        # 绘制玩家动画
-        current_frame = self.frames[int(self.animation_frame)]
-        if not self.facing_right:
-            current_frame = pygame.transform.flip(current_frame, True, False)
-        screen.blit(current_frame, (x * CELL_SIZE + 2, y * CELL_SIZE + 2))
+        # 绘制玩家动画（朝左的帧事先翻转好了）
+        frames = self.frames if self.facing_right else self.flipped_frames
+        screen.blit(frames[int(self.animation_frame)], (x * CELL_SIZE + 2, y * CELL_SIZE + 2))
 
         # 独立绘制剑
         if not self.is_burning:
@@ -301,35 +382,9 @@ class Player:
                 sword_base_x -= 10
                 sword_angle = 135 if not self.sword_swing else (180 - self.sword_angle)
 
-            # 剑的尺寸
-            sword_length = CELL_SIZE * 2 // 3
-            sword_width = 6
-
-            # 计算剑尖的位置
-            angle_rad = math.radians(sword_angle)
-            sword_tip_x = sword_base_x + math.cos(angle_rad) * sword_length
-            sword_tip_y = sword_base_y - math.sin(angle_rad) * sword_length
-
-            # 绘制剑身（带高光效果）
-            pygame.draw.line(screen, SILVER,
-                             (sword_base_x, sword_base_y),
-                             (sword_tip_x, sword_tip_y), sword_width)
-            # 高光效果
-            pygame.draw.line(screen, SILVER_LIGHT,
-                             (sword_base_x + 1, sword_base_y + 1),
-                             (sword_tip_x + 1, sword_tip_y + 1), sword_width // 2)
-
-            # 绘制剑柄
-            handle_length = 12
-            handle_angle = angle_rad + math.pi / 2
-            handle_x = sword_base_x
-            handle_y = sword_base_y
-            pygame.draw.line(screen, BROWN_DARK,
-                             (handle_x - math.cos(handle_angle) * handle_length // 2,
-                              handle_y - math.sin(handle_angle) * handle_length // 2),
-                             (handle_x + math.cos(handle_angle) * handle_length // 2,
-                              handle_y + math.sin(handle_angle) * handle_length // 2),
-                             4)
+            # 剑的角度按 SWORD_STEP 取整，用事先画好的图
+            sword_angle = round(sword_angle / SWORD_STEP) * SWORD_STEP % 360
+            screen.blit(self.swords[sword_angle], (sword_base_x - SWORD_REACH, sword_base_y - SWORD_REACH))
 
     def shoot_fireball(self, direction_x, direction_y):
         if self.fireball_cooldown <= 0 and len(self.fireballs) == 0:  # 确保只有一个火球
@@ -339,29 +394,12 @@ class Player:
             self.sword_cooldown = self.sword_delay
 
 
-# 烟花粒子类
-class Particle:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.vx = random.uniform(-5, 5)
-        self.vy = random.uniform(-5, 5)
-        self.color = (random.randint(50, 255), random.randint(50, 255), random.randint(50, 255))
-        self.lifetime = random.randint(30, 60)
-
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += 0.2
-        self.lifetime -= 1
-
-    def draw(self, screen):
-        if self.lifetime > 0:
-            pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), 2)
+# 生成随机迷宫（使用深度优先搜索算法）
+maze = MazeGrid(bytes([1]) * (MAZE_WIDTH * MAZE_HEIGHT), MAZE_WIDTH, MAZE_HEIGHT)
 
 
-# 生成随机迷宫（使用深度优先搜索算法）
-maze = [[1 for _ in range(MAZE_WIDTH)] for _ in range(MAZE_HEIGHT)]
+# 绘制装饰用的随机数生成器（每个格子重新设置种子，保证每帧画出来的一样）
+decoration_random = random.Random()
 
 
 def draw_door(surface, x, y):
@@ -402,25 +440,26 @@ def draw_wall(surface, x, y):
     pygame.draw.rect(surface, RED_DARK,
                      (x * CELL_SIZE, y * CELL_SIZE, 6, CELL_SIZE))  # 左侧阴影
 
-    # 添加纹理
+    # 添加纹理（使用固定的随机种子，每帧画出来的一样，不会闪烁）
+    decoration_random.seed(x * 3000 + y)
     for i in range(3):
-        texture_x = x * CELL_SIZE + random.randint(8, CELL_SIZE - 10)
-        texture_y = y * CELL_SIZE + random.randint(8, CELL_SIZE - 10)
+        texture_x = x * CELL_SIZE + decoration_random.randint(8, CELL_SIZE - 10)
+        texture_y = y * CELL_SIZE + decoration_random.randint(8, CELL_SIZE - 10)
         pygame.draw.rect(surface, BROWN_DARK,
                          (texture_x, texture_y, 4, 4))
 
-        texture_x = x * CELL_SIZE + random.randint(8, CELL_SIZE - 10)
-        texture_y = y * CELL_SIZE + random.randint(8, CELL_SIZE - 10)
+        texture_x = x * CELL_SIZE + decoration_random.randint(8, CELL_SIZE - 10)
+        texture_y = y * CELL_SIZE + decoration_random.randint(8, CELL_SIZE - 10)
         pygame.draw.rect(surface, RED_DARK,
                          (texture_x, texture_y, 3, 3))
 
 
 def draw_wall_decoration(surface, x, y):
-    # 使用固定的随机种子来减少闪烁
-    random.seed(x * 2000 + y)
+    # 使用固定的随机种子来减少闪烁（用单独的随机数生成器，不影响游戏逻辑的随机数）
+    decoration_random.seed(x * 2000 + y)
 
     # 随机但固定的植物位置
-    if random.random() < 0.3:  # 30%的概率添加植物
+    if decoration_random.random() < 0.3:  # 30%的概率添加植物
         start_x = x * CELL_SIZE + 5 + (x % 10)
         start_y = y * CELL_SIZE + 2 + (y % 8)
         points = [(start_x, start_y)]
@@ -435,14 +474,18 @@ def draw_wall_decoration(surface, x, y):
         pygame.draw.circle(surface, LEAF_GREEN, (leaf_x, leaf_y), 3)
 
 
-def draw_key(surface, x, y, time_passed):
+def key_bob(time_passed):
+    # 钥匙上下浮动的像素数（减慢浮动速度），取整后只有几种，图集里每种画一张
+    return round(math.sin(time_passed * 3) * 2)
+
+
+def draw_key(surface, x, y, float_offset):
     # 钥匙的柄
     handle_center_x = x * CELL_SIZE + CELL_SIZE // 2
     handle_center_y = y * CELL_SIZE + CELL_SIZE // 2
     handle_radius = CELL_SIZE // 4
 
     # 添加浮动效果
-    float_offset = math.sin(time_passed * 3) * 2  # 减慢浮动速度
     handle_center_y += float_offset
 
     # 绘制钥匙的圆形把手
@@ -498,21 +541,35 @@ def create_apple_image():
     return img
 
 
-def draw_grass(surface, x, y, time_passed):
+# 小草摆动的一个周期分成 16 个相位，每个相位小草顶端左右摆动的像素数事先算好
+GRASS_PHASES = 16
+GRASS_SWAY = [round(math.sin(2 * math.pi * phase / GRASS_PHASES) * 2) for phase in range(GRASS_PHASES)]
+
+
+def grass_phase(time_passed):
+    # 大幅降低摆动频率（降低到0.2），一个周期大约 31 秒
+    return int(time_passed * 0.2 / (2 * math.pi) * GRASS_PHASES) % GRASS_PHASES
+
+
+def grass_sway(time_passed):
+    # 取整后只有几种摆动，图集和迷宫图层里每种事先画好一张，每帧只用挑一张
+    return GRASS_SWAY[grass_phase(time_passed)]
+
+
+def draw_grass(surface, x, y, grass_movement):
     # 绘制基础草地
     pygame.draw.rect(surface, GREEN_GRASS,
                      (x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE))
 
     # 添加深色草地纹理（使用固定的随机种子来避免闪烁）
-    random.seed(x * 1000 + y)  # 添加这行
+    decoration_random.seed(x * 1000 + y)
     for i in range(3):
-        grass_x = x * CELL_SIZE + random.randint(0, CELL_SIZE - 4)
-        grass_y = y * CELL_SIZE + random.randint(0, CELL_SIZE - 4)
+        grass_x = x * CELL_SIZE + decoration_random.randint(0, CELL_SIZE - 4)
+        grass_y = y * CELL_SIZE + decoration_random.randint(0, CELL_SIZE - 4)
         pygame.draw.rect(surface, GREEN_DARK,
                          (grass_x, grass_y, 4, 4))
 
-    # 添加随机摆动的小草（大幅降低摆动频率）
-    grass_movement = math.sin(time_passed * 0.2) * 2  # 降低到0.2
+    # 添加随机摆动的小草（grass_movement 是 grass_sway() 算出的摆动）
     base_x = x * CELL_SIZE + (x * 17) % (CELL_SIZE - 10) + 5  # 使用固定位置
     base_y = y * CELL_SIZE + (y * 23) % (CELL_SIZE - 10) + 5
     points = [
@@ -523,104 +580,199 @@ def draw_grass(surface, x, y, time_passed):
     pygame.draw.lines(surface, LEAF_GREEN, False, points, 2)
 
 
+# 钥匙浮动取整后的所有像素数，以及小草所有相位里出现过的摆动
+OFFSETS = range(-2, 3)
+SWAYS = sorted(set(GRASS_SWAY))
+
+
+class TileAtlas:
+    """启动时把每种格子画好几种样式，拼在一张图上（纹理图集）
+
+    墙和草地各有 variants 种纹理，草地的每种纹理再按小草摆动的位置各画一张（摆动动画的所有帧），
+    钥匙按浮动的位置各画一张。
+    之后画迷宫只要用 surface.blits() 从图集里贴格子，不用每个格子调用一堆 pygame.draw。
+    格子用哪种纹理由坐标决定，所以每帧贴出来的一样。
+    """
+
+    def __init__(self, variants=8):
+        self.variants = variants
+        key_width = CELL_SIZE * 3 // 2  # 钥匙的齿会伸到右边的格子里
+        width = max(variants * CELL_SIZE, CELL_SIZE + len(OFFSETS) * key_width)
+        height = (2 + len(SWAYS)) * CELL_SIZE
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha()
+        # 画格子的函数按格子坐标画，先画在草稿上（第 i 种样式画在 (i, i)）再拷到图集里
+        self._scratch = pygame.Surface(((variants + 1) * CELL_SIZE, (variants + 1) * CELL_SIZE),
+                                       pygame.SRCALPHA)
+
+        self.walls = [self._bake(draw_wall, i, (i * CELL_SIZE, 0)) for i in range(variants)]
+        self.door = self._bake(draw_door, 0, (0, CELL_SIZE))
+        self.keys = {offset: self._bake(draw_key, 0, (CELL_SIZE + i * key_width, CELL_SIZE), offset, key_width)
+                     for i, offset in enumerate(OFFSETS)}
+        self.grass = {sway: [self._bake(draw_grass, j, (j * CELL_SIZE, (2 + i) * CELL_SIZE), sway)
+                             for j in range(variants)]
+                      for i, sway in enumerate(SWAYS)}
+        self._scratch = None
+
+    def _bake(self, painter, variant, dest, offset=None, width=CELL_SIZE):
+        """用 painter 画第 variant 种样式，放到图集的 dest 处，返回它在图集里的范围"""
+        self._scratch.fill((0, 0, 0, 0))
+        if offset is None:
+            painter(self._scratch, variant, variant)
+        else:
+            painter(self._scratch, variant, variant, offset)
+        area = pygame.Rect(variant * CELL_SIZE, variant * CELL_SIZE, width, CELL_SIZE)
+        self.surface.blit(self._scratch, dest, area)
+        return pygame.Rect(dest, area.size)
+
+    def variant(self, x, y):
+        return (x * 73856093 ^ y * 19349663) % self.variants
+
+    def tile(self, cell, x, y, sway):
+        """迷宫 (x, y) 处的格子在图集里的范围（钥匙格子是下面的草地）"""
+        if cell == 1:  # 墙
+            return self.walls[self.variant(x, y)]
+        if cell == 3:  # 门
+            return self.door
+        return self.grass[sway][self.variant(x, y)]
+
+    def blit(self, x, y, area):
+        """surface.blits() 用的 (图集, 位置, 范围)"""
+        return self.surface, (x * CELL_SIZE, y * CELL_SIZE), area
+
+
+class MazeLayer:
+    """每关只画一次的迷宫图层（墙、门、草地），每帧贴到屏幕上再画会动的钥匙
+
+    小草摆动的位置只有几种，开始时从图集各拼出一张图层，每帧按摆动的相位挑一张贴上去。
+    迷宫里的格子改变（开门）时用 redraw() 只重画这个格子，所以每帧的开销和迷宫大小无关。
+    """
+
+    def __init__(self, maze, keys):
+        self.maze = maze
+        self.keys = list(keys)
+        self._layers = {}  # 小草摆动的偏移 -> 图层
+        for sway in SWAYS:
+            layer = self._layers[sway] = pygame.Surface((maze.width * CELL_SIZE,
+                                                         maze.height * CELL_SIZE)).convert()
+            layer.blits([tile_atlas.blit(x, y, tile_atlas.tile(maze.get(x, y), x, y, sway))
+                         for y in range(maze.height) for x in range(maze.width)], doreturn=False)
+
+    def background(self, time_passed):
+        return self._layers[grass_sway(time_passed)]
+
+    def redraw(self, x, y):
+        """(x, y) 的格子变了，在已经画好的每张图层上重画它，返回格子的范围"""
+        cell = self.maze.get(x, y)
+        for sway, layer in self._layers.items():
+            layer.blit(*tile_atlas.blit(x, y, tile_atlas.tile(cell, x, y, sway)))
+        return cell_rect(x, y)
+
+    def draw_keys(self, surface, time_passed):
+        """画还没被拾取的钥匙，返回画到的范围"""
+        area = tile_atlas.keys[key_bob(time_passed)]
+        return surface.blits([tile_atlas.blit(x, y, area) for x, y in self.keys
+                              if self.maze.get(x, y) == 2])
+
+
+def cell_rect(x, y, margin=0):
+    """格子 (x, y) 在屏幕上的范围，向四周扩出 margin 像素"""
+    return pygame.Rect(x * CELL_SIZE - margin, y * CELL_SIZE - margin,
+                       CELL_SIZE + 2 * margin, CELL_SIZE + 2 * margin)
+
+
+menu_backgrounds = {}  # 小草摆动的偏移（没有草地时是 None） -> 菜单背景
+
+
+def menu_background(time_passed=None):
+    """菜单的背景：四周一圈墙，给了 time_passed 时中间铺满摆动的草地，否则是棕色；画好后缓存"""
+    sway = grass_sway(time_passed) if time_passed is not None else None
+    background = menu_backgrounds.get(sway)
+    if background is None:
+        background = menu_backgrounds[sway] = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT)).convert()
+        background.fill(GREEN_GRASS if sway is not None else BROWN_LIGHT)
+        tiles = []
+        for y in range(MAZE_HEIGHT):
+            for x in range(MAZE_WIDTH):
+                if x in (0, MAZE_WIDTH - 1) or y in (0, MAZE_HEIGHT - 1):
+                    tiles.append(tile_atlas.blit(x, y, tile_atlas.tile(1, x, y, 0)))
+                elif sway is not None:
+                    tiles.append(tile_atlas.blit(x, y, tile_atlas.tile(0, x, y, sway)))
+        background.blits(tiles, doreturn=False)
+    return background
+
+
+def create_pathfinder(maze, end_pos):
+    """小迷宫用路口图，大迷宫用分层寻路；两者都支持 find_path()、distance() 和 open_cell()"""
+    if maze.width * maze.height >= HPA_MIN_CELLS:
+        return HierarchicalPathfinder(maze)
+    return CorridorGraph(maze, (end_pos,))
+
+
 def find_path_length(start, end):
-    """使用广度优先搜索计算两点之间的最短路径长度"""
-    visited = set()
-    queue = [(start, 0)]  # (位置, 距离)
-    while queue:
-        (x, y), dist = queue.pop(0)
-        if (x, y) == end:
-            return dist
-        if (x, y) not in visited:
-            visited.add((x, y))
-            for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-                new_x, new_y = x + dx, y + dy
-                if (0 <= new_x < MAZE_WIDTH and 0 <= new_y < MAZE_HEIGHT and
-                        maze[new_y][new_x] != 1):  # 不是墙就可以走
-                    queue.append(((new_x, new_y), dist + 1))
-    return float('inf')  # 如果找不到路径，返回无穷大
+    """两点之间的最短路径长度（不能穿过墙和门）"""
+    distance = path_cache.distance(start, end)
+    return float('inf') if distance is None else distance  # 如果找不到路径，返回无穷大
+
+
+def find_hint_path(planner, position):
+    """提示：按到终点的最短路线，去下一个目标（钥匙、门或终点）的路径"""
+    steps, target = planner.plan(position)
+    if target is None:
+        return []
+    if maze.get(*target) != 3:
+        return path_cache.find_path(position, target)
+    # 门还没开，寻路走不进去：先走到门旁边最近的通道，再进门
+    x, y = target
+    paths = [path_cache.find_path(position, side)
+             for side in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)) if maze.get(*side) in (0, 2)]
+    paths = [path for path in paths if path]
+    if not paths:
+        return []
+    return min(paths, key=len) + [target]
+
+
+def draw_hint(surface, path):
+    """用小圆点画出提示路线，返回画到的范围"""
+    return [pygame.draw.circle(surface, GOLD,
+                               (x * CELL_SIZE + CELL_SIZE // 2, y * CELL_SIZE + CELL_SIZE // 2), 3)
+            for x, y in path[1:]]
 
 
 def generate_maze_dfs():
-    # 初始化迷宫
-    maze = [[1 for _ in range(MAZE_WIDTH)] for _ in range(MAZE_HEIGHT)]
-
-    def carve_path(x, y):
-        maze[y][x] = 0
-        directions = [(0, 2), (2, 0), (0, -2), (-2, 0)]
-        random.shuffle(directions)
-
-        for dx, dy in directions:
-            new_x, new_y = x + dx, y + dy
-            if (0 <= new_x < MAZE_WIDTH and 0 <= new_y < MAZE_HEIGHT and
-                    maze[new_y][new_x] == 1):
-                maze[y + dy // 2][x + dx // 2] = 0
-                carve_path(new_x, new_y)
-
-    # 从随机位置开始生成迷宫
-    start_x = random.randrange(1, MAZE_WIDTH - 1, 2)
-    start_y = random.randrange(1, MAZE_HEIGHT - 1, 2)
-    carve_path(start_x, start_y)
-
-    # 随机选择起点和终点
-    valid_positions = [(x, y) for x in range(MAZE_WIDTH) for y in range(MAZE_HEIGHT)
-                       if maze[y][x] == 0]
-
-    start_pos = random.choice(valid_positions)
-    valid_positions.remove(start_pos)
-
-    # 确保终点离起点足够远
-    end_positions = [(x, y) for x, y in valid_positions
-                     if abs(x - start_pos[0]) + abs(y - start_pos[1]) > MAZE_WIDTH // 2]
-    end_pos = random.choice(end_positions)
-
-    # 放置4个门和4个钥匙
-    doors = []
-    keys = []
-
-    # 找到合适的门的位置（必须在墙上，且至少一边有通道）
-    wall_positions = []
-    for y in range(1, MAZE_HEIGHT - 1):
-        for x in range(1, MAZE_WIDTH - 1):
-            if maze[y][x] == 1:
-                # 检查是否至少有一边是通道
-                if ((maze[y - 1][x] == 0 and maze[y + 1][x] == 0) or
-                        (maze[y][x - 1] == 0 and maze[y][x + 1] == 0)):
-                    wall_positions.append((x, y))
-
-    # 随机选择4个门的位置
-    if len(wall_positions) >= 4:
-        door_positions = random.sample(wall_positions, 4)
-        for x, y in door_positions:
-            maze[y][x] = 3  # 3表示门
-            doors.append((x, y))
-
-    # 在通道上放置4个钥匙
-    path_positions = [(x, y) for x, y in valid_positions
-                      if (x, y) != end_pos and maze[y][x] == 0]
-    if len(path_positions) >= 4:
-        key_positions = random.sample(path_positions, 4)
-        for x, y in key_positions:
-            maze[y][x] = 2  # 2表示钥匙
-            keys.append((x, y))
-
-    return maze, start_pos, end_pos, doors, keys
+    if level_pack is not None:
+        # 从关卡包里读取第 level_seed 关（超过关卡数量时从头开始）
+        level = level_pack[level_seed % len(level_pack)]
+        if (level[0].width, level[0].height) != (MAZE_WIDTH, MAZE_HEIGHT):
+            raise ValueError(f"关卡包中的迷宫大小是 {level[0].width}x{level[0].height}，"
+                             f"游戏需要 {MAZE_WIDTH}x{MAZE_HEIGHT}")
+        return level
+    # 按当前关卡的种子读取关卡（第一次会生成并写入磁盘缓存，之后直接读取）
+    return load_level(level_seed, MAZE_WIDTH, MAZE_HEIGHT, MAZE_ALGORITHM)
 
 
 # 生成迷宫并初始化游戏状态
 maze, start_pos, end_pos, doors, keys = generate_maze_dfs()
+distance_field = DistanceField(maze)  # 到各个格子的步数，开门后要调用 invalidate()
+pathfinder = create_pathfinder(maze, end_pos)  # 寻路和长距离查询用，开门时局部更新
+path_cache = PathCache(pathfinder)  # 所有寻路查询都经过它，迷宫改变时 version 加一
 player = Player(start_pos[0], start_pos[1])
 apple_x, apple_y = end_pos
 
 # 创建苹果图形
 apple_img = create_apple_image()
 
+# 所有格子的纹理图集
+tile_atlas = TileAtlas()
+
 # 游戏状态
-particles = []
+particle_budget = ParticleBudget(60)  # 画面卡的时候减少粒子特效
+effects = EntityStore(budget=particle_budget)  # 怪物和火球的粒子特效，每帧一起更新
+FIREWORK_CAPACITY = 65536  # 胜利画面烟花粒子池的大小
 game_won = False
 game_over = False
 start_time = time.time()
 GAME_DURATION = 90  # 增加到90秒
+HINT_DURATION = 3  # 按 H 后提示路线显示的秒数
 
 # 游戏主循环
 clock = pygame.time.Clock()
@@ -634,7 +786,6 @@ class Monster:
         self.animation_frame = 0
         self.move_cooldown = 0
         self.move_delay = 15  # 每0.25秒移动一次
-        self.particles = []
         self.active = True
         self.is_dying = False
         self.death_frame = 0
@@ -656,19 +807,13 @@ class Monster:
             return
 
         # 随机决定是追踪玩家还是随机移动
+        step = None
         if random.random() < 0.7:  # 70%的概率追踪玩家
-            # 计算到玩家的方向
-            dx = player_x - self.x
-            dy = player_y - self.y
-
-            # 选择主要移动方向
-            if abs(dx) > abs(dy):
-                next_x = self.x + (1 if dx > 0 else -1)
-                next_y = self.y
-            else:
-                next_x = self.x
-                next_y = self.y + (1 if dy > 0 else -1)
-        else:  # 30%的概率随机移动
+            # 沿着到玩家的距离图往下走，走的是迷宫里的最短路线
+            step = distance_field.step_toward((player_x, player_y), (self.x, self.y))
+        if step is not None:
+            next_x, next_y = step
+        else:  # 30%的概率（或者走不到玩家身边时）随机移动
             # 随机选择一个方向：上下左右
             direction = random.choice([(0, 1), (0, -1), (1, 0), (-1, 0)])
             next_x = self.x + direction[0]
@@ -676,8 +821,8 @@ class Monster:
 
         # 检查新位置是否有效
         if (0 <= next_x < MAZE_WIDTH and 0 <= next_y < MAZE_HEIGHT and
-                maze[next_y][next_x] != 1 and  # 不是墙
-                maze[next_y][next_x] != 3):  # 不是门
+                maze.get(next_x, next_y) != 1 and  # 不是墙
+                maze.get(next_x, next_y) != 3):  # 不是门
             self.x = next_x
             self.y = next_y
             self.move_cooldown = self.move_delay
@@ -685,33 +830,16 @@ class Monster:
             # 生成移动粒子效果
             center_x = self.x * CELL_SIZE + CELL_SIZE // 2
             center_y = self.y * CELL_SIZE + CELL_SIZE // 2
-            for _ in range(3):
-                particle = Particle(
-                    center_x + random.randint(-5, 5),
-                    center_y + random.randint(-5, 5)
-                )
-                particle.color = (200, 0, 0)  # 红色粒子
-                particle.lifetime = random.randint(10, 20)
-                particle.vx = random.uniform(-1, 1)
-                particle.vy = random.uniform(-1, 1)
-                self.particles.append(particle)
-
-        # 更新粒子效果
-        for particle in self.particles[:]:
-            particle.update()
-            if particle.lifetime <= 0:
-                self.particles.remove(particle)
+            rng = effects.random
+            effects.spawn(PARTICLE,
+                          center_x + rng.integers(-5, 5, 3, endpoint=True),
+                          center_y + rng.integers(-5, 5, 3, endpoint=True),
+                          rng.uniform(-1, 1, 3), rng.uniform(-1, 1, 3),
+                          rng.integers(10, 20, 3, endpoint=True),
+                          (200, 0, 0))  # 红色粒子
 
     def reset_position(self, new_pos, maze):
         self.x, self.y = new_pos
-        self.particles = []
-        # 立即更新路径
-        grid = Grid(matrix=[[0 if cell != 1 else 1 for cell in row] for row in maze])
-        start = grid.node(self.x, self.y)
-        end = grid.node(player.x, player.y)
-        finder = AStarFinder(diagonal_movement=DiagonalMovement.never)
-        path, _ = finder.find_path(start, end, grid)
-        self.path = path
 
     def draw(self, screen):
         if self.is_dying:
@@ -721,15 +849,8 @@ class Monster:
 
             # 生成爆炸粒子
             if self.death_frame > 0:
-                for _ in range(5):
-                    angle = random.uniform(0, math.pi * 2)
-                    speed = random.uniform(2, 5)
-                    particle = Particle(center_x, center_y)
-                    particle.vx = math.cos(angle) * speed
-                    particle.vy = math.sin(angle) * speed
-                    particle.color = (255, random.randint(0, 100), 0)  # 红色系
-                    particle.lifetime = random.randint(10, 20)
-                    self.particles.append(particle)
+                colors = [(255, green, 0) for green in effects.random.integers(0, 100, 5, endpoint=True)]  # 红色系
+                effects.burst(center_x, center_y, 5, 2, 5, (10, 20), colors)
                 self.death_frame -= 1
 
             # 如果死亡动画结束，重置位置
@@ -768,29 +889,26 @@ class Monster:
                                (center_x + eye_offset, center_y - eye_offset),
                                eye_radius)
 
-            # 绘制粒子效果
-            for particle in self.particles:
-                particle.draw(screen)
-
 
 # 在游戏初始化部分添加怪物
 def find_monster_start_position(maze, player_pos):
-    valid_positions = []
     min_distance = MAZE_WIDTH // 3  # 确保怪物和玩家的最小距离
 
-    for y in range(MAZE_HEIGHT):
-        for x in range(MAZE_WIDTH):
-            if maze[y][x] == 0:  # 如果是通道
-                distance = abs(x - player_pos[0]) + abs(y - player_pos[1])
-                if distance >= min_distance:
-                    valid_positions.append((x, y))
+    # 通道上离玩家足够远、又能走到玩家身边的格子（按实际要走的步数算）
+    distance = distance_field.field(tuple(player_pos))
+    valid_positions = positions(maze.floor_mask() & (distance >= min_distance))
+    if not valid_positions:
+        valid_positions = positions(maze.floor_mask() & (distance > 0))
 
     return random.choice(valid_positions)
 
 
+def create_monsters(maze, player_pos):
+    return [Monster(*find_monster_start_position(maze, player_pos)) for _ in range(MONSTER_COUNT)]
+
+
 # 在游戏状态初始化部分添加
-monster_pos = find_monster_start_position(maze, start_pos)
-monster = Monster(monster_pos[0], monster_pos[1])
+monsters = create_monsters(maze, start_pos)
 
 
 # 添加火球类
@@ -802,7 +920,6 @@ class Fireball:
         self.dy = direction_y * (CELL_SIZE / 20)
         self.lifetime = 30  # 减少存在时间，因为速度更快了
         self.size = CELL_SIZE // 3
-        self.particles = []
 
     def update(self):
         self.x += self.dx
@@ -811,18 +928,8 @@ class Fireball:
 
         # 火球尾迹效果
         if random.random() < 0.3:  # 减少粒子生成频率
-            particle = Particle(self.x, self.y)
-            particle.color = (255, random.randint(100, 200), 0)  # 火焰色
-            particle.lifetime = random.randint(5, 10)
-            particle.vx = random.uniform(-1, 1)
-            particle.vy = random.uniform(-1, 1)
-            self.particles.append(particle)
-
-        # 更新粒子
-        for particle in self.particles[:]:
-            particle.update()
-            if particle.lifetime <= 0:
-                self.particles.remove(particle)
+            effects.spawn(TRAIL, self.x, self.y, random.uniform(-1, 1), random.uniform(-1, 1),
+                          random.randint(5, 10), (255, random.randint(100, 200), 0))  # 火焰色
 
     def draw(self, screen):
         # 绘制火球核心（立体效果）
@@ -830,57 +937,13 @@ class Fireball:
         pygame.draw.circle(screen, (255, 150, 0), (int(self.x - 2), int(self.y - 2)), self.size - 2)  # 橙色中层
         pygame.draw.circle(screen, (255, 255, 0), (int(self.x - 4), int(self.y - 4)), self.size - 4)  # 黄色顶层
 
-        # 绘制粒子
-        for particle in self.particles:
-            particle.draw(screen)
-
     def get_grid_position(self):
         return (int(self.x // CELL_SIZE), int(self.y // CELL_SIZE))
 
-
-# 在Particle类后添加新的烟花粒子类
-class Firework:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.particles = []
-        self.exploded = False
-        self.speed = random.uniform(-15, -10)
-        self.color = (random.randint(50, 255), random.randint(50, 255), random.randint(50, 255))
-
-    def update(self):
-        if not self.exploded:
-            self.y += self.speed
-            if self.speed < -1:
-                self.speed += 0.5
-            if self.speed >= -1:
-                self.explode()
-        else:
-            for particle in self.particles[:]:
-                particle.update()
-                if particle.lifetime <= 0:
-                    self.particles.remove(particle)
-
-    def explode(self):
-        self.exploded = True
-        for _ in range(50):  # 更多的粒子
-            angle = random.uniform(0, math.pi * 2)
-            speed = random.uniform(3, 8)
-            particle = Particle(self.x, self.y)
-            particle.vx = math.cos(angle) * speed
-            particle.vy = math.sin(angle) * speed
-            particle.color = self.color
-            particle.lifetime = random.randint(30, 60)
-            self.particles.append(particle)
-
-    def draw(self, screen):
-        if not self.exploded:
-            pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), 3)
-        for particle in self.particles:
-            particle.draw(screen)
-
-    def is_dead(self):
-        return self.exploded and len(self.particles) == 0
+    def rect(self):
+        # 三层圆往左上错开了 4 像素，四周多留一点
+        size = self.size + 4
+        return pygame.Rect(int(self.x) - size, int(self.y) - size, size * 2, size * 2)
 
 
 # 添加按钮类
@@ -911,6 +974,7 @@ class Button:
         text = font.render(self.text, True, BROWN_DARK)
         text_rect = text.get_rect(center=self.rect.center)
         screen.blit(text, text_rect)
+        return self.rect.union(shadow_rect)
 
     def handle_event(self, event):
         if event.type == pygame.MOUSEMOTION:
@@ -929,21 +993,8 @@ def show_start_menu():
                          "Exit", RED_DARK)
 
     while True:
-        # 绘制背景（草地）
-        screen.fill(GREEN_GRASS)
-
-        # 绘制装饰性的墙壁（只在四周）
-        for i in range(0, WINDOW_WIDTH, CELL_SIZE):
-            draw_wall(screen, i // CELL_SIZE, 0)  # 顶部
-            draw_wall(screen, i // CELL_SIZE, MAZE_HEIGHT - 1)  # 底部
-        for i in range(0, WINDOW_HEIGHT, CELL_SIZE):
-            draw_wall(screen, 0, i // CELL_SIZE)  # 左侧
-            draw_wall(screen, MAZE_WIDTH - 1, i // CELL_SIZE)  # 右侧
-
-        # 在草地上添加一些装饰
-        for i in range(1, MAZE_WIDTH - 1):
-            for j in range(1, MAZE_HEIGHT - 1):
-                draw_grass(screen, i, j, pygame.time.get_ticks() / 1000)
+        # 绘制背景：草地，四周是装饰性的墙壁
+        renderer.begin(screen, menu_background(pygame.time.get_ticks() / 1000))
 
         # 绘制标题
         font = pygame.font.Font(None, 74)
@@ -954,23 +1005,25 @@ def show_start_menu():
         shadow_rect = title_rect.copy()
         shadow_rect.x += 4
         shadow_rect.y += 4
-        screen.blit(shadow_text, shadow_rect)
-        screen.blit(title, title_rect)
+        renderer.mark(screen.blit(shadow_text, shadow_rect))
+        renderer.mark(screen.blit(title, title_rect))
 
         # 绘制按钮
-        start_button.draw(screen)
-        exit_button.draw(screen)
+        renderer.mark(start_button.draw(screen))
+        renderer.mark(exit_button.draw(screen))
 
         # 处理事件
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F2:
+                renderer.toggle()
             if start_button.handle_event(event):
                 return True
             if exit_button.handle_event(event):
                 return False
 
-        pygame.display.flip()
+        renderer.present(screen)
         clock.tick(60)
 
 
@@ -981,33 +1034,20 @@ def show_victory_menu():
     exit_button = Button(WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 2 + 150, 200, 50,
                          "Exit", RED_DARK)
 
-    fireworks = []
+    fireworks = EntityStore(FIREWORK_CAPACITY, particle_budget)
 
     while True:
-        # 绘制背景
-        screen.fill(BROWN_LIGHT)
-
-        # 绘制装饰性的墙壁
-        for i in range(0, WINDOW_WIDTH, CELL_SIZE):
-            draw_wall(screen, i // CELL_SIZE, 0)
-            draw_wall(screen, i // CELL_SIZE, MAZE_HEIGHT - 1)
-        for i in range(0, WINDOW_HEIGHT, CELL_SIZE):
-            draw_wall(screen, 0, i // CELL_SIZE)
-            draw_wall(screen, MAZE_WIDTH - 1, i // CELL_SIZE)
+        # 绘制背景和装饰性的墙壁
+        renderer.begin(screen, menu_background())
 
         # 生成新的烟花
         if random.random() < 0.1:
-            fireworks.append(Firework(
-                random.randint(0, WINDOW_WIDTH),
-                WINDOW_HEIGHT + 10
-            ))
+            fireworks.launch(random.randint(0, WINDOW_WIDTH), WINDOW_HEIGHT + 10)
 
         # 更新和绘制烟花
-        for firework in fireworks[:]:
-            firework.update()
-            firework.draw(screen)
-            if firework.is_dead():
-                fireworks.remove(firework)
+        fireworks.update()
+        fireworks.draw(screen)
+        renderer.mark_all(fireworks.dirty_rects(CELL_SIZE))
 
         # 绘制胜利文字
         font = pygame.font.Font(None, 74)
@@ -1018,42 +1058,58 @@ def show_victory_menu():
         shadow_rect = text_rect.copy()
         shadow_rect.x += 4
         shadow_rect.y += 4
-        screen.blit(shadow_text, shadow_rect)
-        screen.blit(text, text_rect)
+        renderer.mark(screen.blit(shadow_text, shadow_rect))
+        renderer.mark(screen.blit(text, text_rect))
 
         # 绘制按钮
-        restart_button.draw(screen)
-        exit_button.draw(screen)
+        renderer.mark(restart_button.draw(screen))
+        renderer.mark(exit_button.draw(screen))
 
         # 处理事件
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                report_particle_budget()
                 pygame.quit()
                 sys.exit()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F2:
+                renderer.toggle()
             if restart_button.handle_event(event):
                 return True
             if exit_button.handle_event(event):
                 return False
 
-        pygame.display.flip()
+        renderer.present(screen)
         clock.tick(60)
+        particle_budget.tick(clock.get_rawtime())
 
 
 # 修改主游戏循环
 def main_game():
-    global maze, start_pos, end_pos, doors, keys, player, apple_x, apple_y, monster
+    global maze, start_pos, end_pos, doors, keys, player, apple_x, apple_y, monsters, level_seed
+    global distance_field, pathfinder, path_cache
 
     # 重置游戏状态
     maze, start_pos, end_pos, doors, keys = generate_maze_dfs()
+    distance_field = DistanceField(maze)
+    pathfinder = create_pathfinder(maze, end_pos)
+    path_cache = PathCache(pathfinder)
     player = Player(start_pos[0], start_pos[1])
     apple_x, apple_y = end_pos
-    monster_pos = find_monster_start_position(maze, start_pos)
-    monster = Monster(monster_pos[0], monster_pos[1])
+    monsters = create_monsters(maze, start_pos)
+    maze_layer = MazeLayer(maze, keys)  # 每关画一次迷宫，之后只重画开了的门
+    # 到终点的最短路线（会用钥匙开门抄近路），用来算标准步数、标准时间和提示
+    planner = RoutePlanner(maze, keys, doors, end_pos)
+    par, _ = planner.plan(start_pos)
+    par_time = par * player.move_delay / 60 if par is not None else 0
+    moves = 0
+    hint_path = []
+    hint_until = 0
 
     game_won = False
     game_over = False
     start_time = time.time()
-    fireworks = []
+    fireworks = EntityStore(FIREWORK_CAPACITY, particle_budget)
+    effects.clear()  # 上一关剩下的特效不带到这一关
 
     while True:
         current_time = time.time()
@@ -1071,6 +1127,11 @@ def main_game():
                 if event.key == pygame.K_SPACE and not game_over and not game_won:
                     direction_x = 1 if player.facing_right else -1
                     player.shoot_fireball(direction_x, 0)
+                elif event.key == pygame.K_F2:
+                    renderer.toggle()
+                elif event.key == pygame.K_h and not game_over and not game_won:
+                    hint_path = find_hint_path(planner, (player.x, player.y))
+                    hint_until = current_time + HINT_DURATION
 
         if not game_won and not game_over:
             # 获取按键状态
@@ -1095,105 +1156,121 @@ def main_game():
 
                     if (0 <= new_x < MAZE_WIDTH and 0 <= new_y < MAZE_HEIGHT):
                         can_move = False
-                        if maze[new_y][new_x] == 0 or maze[new_y][new_x] == 2:  # 通道或钥匙
+                        cell = maze.get(new_x, new_y)
+                        if cell == 0 or cell == 2:  # 通道或钥匙
                             can_move = True
-                            if maze[new_y][new_x] == 2:  # 拾取钥匙
-                                maze[new_y][new_x] = 0
+                            if cell == 2:  # 拾取钥匙
+                                maze.set(new_x, new_y, 0)
+                                path_cache.version += 1
                                 player.keys += 1
                                 key_sound.play()
-                        elif maze[new_y][new_x] == 3 and player.keys > 0:  # 门
+                        elif cell == 3 and player.keys > 0:  # 门
                             can_move = True
-                            maze[new_y][new_x] = 0
+                            maze.set(new_x, new_y, 0)
+                            renderer.touch(maze_layer.redraw(new_x, new_y))
+                            distance_field.invalidate()  # 开门后路线变了
+                            pathfinder.open_cell(new_x, new_y)
+                            path_cache.version += 1
                             player.keys -= 1
                             door_sound.play()
 
                         if can_move:
                             player.x = new_x
                             player.y = new_y
+                            moves += 1
+                            if current_time < hint_until:
+                                # 提示显示期间跟着玩家重新规划（拿到钥匙后下一个目标会变）
+                                hint_path = find_hint_path(planner, (player.x, player.y))
 
         # 更新玩家动画
         player.update(dx, dy)
 
-        # 更新怪物
-        monster.update(player.x, player.y, maze)
+        # 更新怪物（玩家换了格子时第一个怪物会算出新的流场，其他怪物直接查表）
+        for monster in monsters:
+            monster.update(player.x, player.y, maze)
 
-        # 检查怪物是否抓到玩家
-        if not monster.dead and not monster.is_dying and monster.x == player.x and monster.y == player.y:
-            game_over = True
-            player.is_burning = True
-            death_sound.play()
-            monster_sound.play()
+            # 检查怪物是否抓到玩家
+            if not monster.dead and not monster.is_dying and monster.x == player.x and monster.y == player.y:
+                game_over = True
+                player.is_burning = True
+                death_sound.play()
+                monster_sound.play()
 
-        # 清空屏幕
-        screen.fill(WHITE)
+        # 绘制迷宫（图层盖满整个窗口，不用先清空屏幕）和还没拾取的钥匙
+        # 画到屏幕上的东西都用 renderer.mark() 记下范围，脏矩形模式下只重画和提交这些地方
+        renderer.begin(screen, maze_layer.background(elapsed_time))
+        renderer.mark_all(maze_layer.draw_keys(screen, elapsed_time))
 
-        # 绘制迷宫
-        for y in range(MAZE_HEIGHT):
-            for x in range(MAZE_WIDTH):
-                if maze[y][x] == 0:  # 通道
-                    draw_grass(screen, x, y, elapsed_time)
-                elif maze[y][x] == 1:  # 墙
-                    draw_wall(screen, x, y)
-                elif maze[y][x] == 2:  # 钥匙
-                    draw_grass(screen, x, y, elapsed_time)
-                    draw_key(screen, x, y, elapsed_time)
-                elif maze[y][x] == 3:  # 门
-                    draw_door(screen, x, y)
-
-        # 绘制玩家
+        # 绘制提示路线
+        if current_time < hint_until:
+            renderer.mark_all(draw_hint(screen, hint_path))
+
+        # 绘制玩家（剑会伸到旁边的格子里）
         player.draw(screen, player.x, player.y)
+        renderer.mark(cell_rect(player.x, player.y, CELL_SIZE))
 
         # 绘制苹果
-        screen.blit(apple_img, (apple_x * CELL_SIZE + 2, apple_y * CELL_SIZE + 2))
+        renderer.mark(screen.blit(apple_img, (apple_x * CELL_SIZE + 2, apple_y * CELL_SIZE + 2)))
 
         # 绘制剩余时间
         font = pygame.font.Font(None, 36)
-        time_text = font.render(f'Time: {remaining_time}s', True, BLACK)
-        screen.blit(time_text, (10, 10))
+        time_text = font.render(f'Time: {remaining_time}s  Par time: {par_time:.0f}s', True, BLACK)
+        renderer.mark(screen.blit(time_text, (10, 10)))
 
         # 绘制钥匙数量
         key_text = font.render(f'Keys: {player.keys}', True, GOLD)
-        screen.blit(key_text, (10, 40))
+        renderer.mark(screen.blit(key_text, (10, 40)))
+
+        # 绘制步数和标准步数
+        moves_text = font.render(f'Moves: {moves}  Par: {par}', True, BLACK)
+        renderer.mark(screen.blit(moves_text, (10, 70)))
 
         # 绘制怪物
-        monster.draw(screen)
+        for monster in monsters:
+            monster.draw(screen)
+            renderer.mark(cell_rect(monster.x, monster.y, CELL_SIZE // 2))
 
         # 更新和检查火球碰撞
         for fireball in player.fireballs[:]:
             fireball.update()
             fireball.draw(screen)
+            renderer.mark(fireball.rect())
             fx, fy = fireball.get_grid_position()
 
             # 检查火球是否击中怪物
-            if (fx, fy) == (monster.x, monster.y) and not monster.is_dying:
-                monster.die()
+            target = next((monster for monster in monsters
+                           if (fx, fy) == (monster.x, monster.y) and not monster.is_dying), None)
+            if target is not None:
+                target.die()
                 player.fireballs.remove(fireball)
                 break
             # 检查火球是否击中墙
             if 0 <= fx < MAZE_WIDTH and 0 <= fy < MAZE_HEIGHT:
-                if maze[fy][fx] == 1:
+                if maze.get(fx, fy) == 1:
                     player.fireballs.remove(fireball)
                     break
 
+        # 所有粒子特效一起更新和绘制
+        effects.update()
+        effects.draw(screen)
+        renderer.mark_all(effects.dirty_rects(CELL_SIZE))
+
         # 检查是否获胜
         if player.x == apple_x and player.y == apple_y and not game_won:
             game_won = True
+            level_seed += 1  # 通关后进入下一关，失败则重玩同一关
             win_sound.play()
 
         if game_won:
+            renderer.invalidate()  # 烟花满屏都是，直接整屏提交
+
             # 生成新的烟花
             if random.random() < 0.1:
-                fireworks.append(Firework(
-                    random.randint(0, WINDOW_WIDTH),
-                    WINDOW_HEIGHT + 10
-                ))
+                fireworks.launch(random.randint(0, WINDOW_WIDTH), WINDOW_HEIGHT + 10)
 
             # 更新和绘制烟花
-            for firework in fireworks[:]:
-                firework.update()
-                firework.draw(screen)
-                if firework.is_dead():
-                    fireworks.remove(firework)
+            fireworks.update()
+            fireworks.draw(screen)
 
             # 显示获胜文字
             font = pygame.font.Font(None, 74)
@@ -1201,14 +1278,23 @@ def main_game():
             text_rect = text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
             screen.blit(text, text_rect)
 
-        pygame.display.flip()
+        if game_over:
+            renderer.invalidate()
+        renderer.present(screen)
         clock.tick(60)
+        particle_budget.tick(clock.get_rawtime())
 
         if game_over or (game_won and len(fireworks) == 0):
             time.sleep(1)  # 等待1秒
             return True
 
 
+def report_particle_budget():
+    # 退出时报告画面卡顿、减少特效的次数
+    if particle_budget.slow_frames:
+        print(particle_budget.report())
+
+
 # 修改主程序入口
 def main():
     while True:
@@ -1217,6 +1303,7 @@ def main():
                 break
         else:
             break
+    report_particle_budget()
     pygame.quit()
     sys.exit()
 
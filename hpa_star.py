@@ -0,0 +1,253 @@
+from collections import deque
+from heapq import heappop, heappush
+
+import numpy as np
+
+from distance_field import BLOCKING
+
+
+class HierarchicalPathfinder:
+    """分层寻路（HPA*），用于 2000x2000 以上的大迷宫
+
+    迷宫切成 cluster_size x cluster_size 的区块。相邻区块边界两边都能走的格子对就是入口
+    （迷宫里走廊只有一格宽，穿过边界的地方很少，所以每一对都保留，找到的路线就是最短的）；
+    每个区块记录自己的入口之间在区块内部的步数。
+    寻路时先在入口组成的抽象图上搜索，再只对路线经过的区块做区块内的细化。
+    区块的入口和内部步数在第一次用到时才计算并缓存，
+    格子改变（开门）时只丢掉这个格子所在区块的缓存（在边界上时还有相邻区块）。
+    内部的格子下标都是四周补了一圈墙之后的扁平下标。
+    """
+
+    def __init__(self, maze, cluster_size=16, blocking=BLOCKING):
+        self.width = maze.width
+        self.height = maze.height
+        self.stride = maze.width + 2
+        self.cluster_size = cluster_size
+        self.columns = -(-maze.width // cluster_size)
+        self.rows = -(-maze.height // cluster_size)
+        self.walkable = bytearray(np.pad(~np.isin(maze.cells, blocking), 1).tobytes())
+        self._borders = {}  # (区块, 右边或下边的区块) -> [(这边的格子, 那边的格子), ...]
+        self._entrances = {}  # 区块 -> {入口格子: 对面区块的格子集合}
+        self._intra = {}  # 区块 -> {入口格子: [(相连的入口格子, 步数), ...]}
+        self.searched = 0  # 上一次搜索展开的抽象节点数
+
+    # 区块
+    def _cluster_of(self, index):
+        y, x = divmod(index, self.stride)
+        return (y - 1) // self.cluster_size * self.columns + (x - 1) // self.cluster_size
+
+    def _bounds(self, cluster):
+        """区块在补墙坐标系中的范围 (x0, y0, x1, y1)，不包括 x1 和 y1"""
+        row, column = divmod(cluster, self.columns)
+        size = self.cluster_size
+        x0, y0 = column * size + 1, row * size + 1
+        return x0, y0, min(x0 + size, self.width + 1), min(y0 + size, self.height + 1)
+
+    def _neighbors(self, cluster):
+        row, column = divmod(cluster, self.columns)
+        if column > 0:
+            yield cluster - 1
+        if column < self.columns - 1:
+            yield cluster + 1
+        if row > 0:
+            yield cluster - self.columns
+        if row < self.rows - 1:
+            yield cluster + self.columns
+
+    def _border(self, first, second):
+        """两个相邻区块之间的入口对（first < second），第一次用到时计算"""
+        key = (first, second)
+        transitions = self._borders.get(key)
+        if transitions is None:
+            x0, y0, x1, y1 = self._bounds(first)
+            stride = self.stride
+            if second == first + 1 and (first + 1) % self.columns:  # second 在右边
+                pairs = [(y * stride + x1 - 1, y * stride + x1) for y in range(y0, y1)]
+            else:  # second 在下边
+                pairs = [((y1 - 1) * stride + x, y1 * stride + x) for x in range(x0, x1)]
+            transitions = [(a, b) for a, b in pairs if self.walkable[a] and self.walkable[b]]
+            self._borders[key] = transitions
+        return transitions
+
+    def _cluster_entrances(self, cluster):
+        """区块的入口：{入口格子: 对面区块的格子集合}"""
+        entrances = self._entrances.get(cluster)
+        if entrances is None:
+            entrances = {}
+            for other in self._neighbors(cluster):
+                for a, b in self._border(min(cluster, other), max(cluster, other)):
+                    inside, outside = (a, b) if cluster < other else (b, a)
+                    entrances.setdefault(inside, set()).add(outside)
+            self._entrances[cluster] = entrances
+        return entrances
+
+    def _cluster_edges(self, cluster):
+        """抽象图中从区块的入口出发的边：{入口: [(入口, 步数), ...]}，第一次用到时计算
+
+        包括区块内其他入口（步数是区块内的最短距离）和边界对面的格子（步数是 1）。
+        """
+        edges = self._intra.get(cluster)
+        if edges is None:
+            entrances = self._cluster_entrances(cluster)
+            edges = {}
+            for entrance, outside in entrances.items():
+                distance, _ = self._bfs(entrance, cluster, entrances)
+                edges[entrance] = [(other, distance[other]) for other in entrances
+                                   if other != entrance and other in distance]
+                edges[entrance] += [(other, 1) for other in outside]
+            self._intra[cluster] = edges
+        return edges
+
+    def _bfs(self, source, cluster, targets=None, goal=None):
+        """只在区块内的 BFS，返回 ({格子: 步数}, {格子: 上一个格子})
+
+        给了 targets 时找到所有目标就停下；给了 goal 时走到 goal 就停下。
+        """
+        x0, y0, x1, y1 = self._bounds(cluster)
+        stride = self.stride
+        walkable = self.walkable
+        distance = {source: 0}
+        parent = {source: -1}
+        remaining = len(targets) - (source in targets) if targets is not None else -1
+        queue = deque([source])
+        while queue and remaining:
+            index = queue.popleft()
+            if index == goal:
+                break
+            step = distance[index] + 1
+            y, x = divmod(index, stride)
+            for neighbor, inside in ((index - stride, y > y0), (index + stride, y < y1 - 1),
+                                     (index - 1, x > x0), (index + 1, x < x1 - 1)):
+                if inside and walkable[neighbor] and neighbor not in distance:
+                    distance[neighbor] = step
+                    parent[neighbor] = index
+                    queue.append(neighbor)
+                    if targets is not None and neighbor in targets:
+                        remaining -= 1
+        return distance, parent
+
+    # 修改
+    def open_cell(self, x, y):
+        """(x, y) 变成了通道（开门），只丢掉受影响区块的缓存"""
+        self.set_walkable(x, y, True)
+
+    def set_walkable(self, x, y, walkable):
+        index = (y + 1) * self.stride + x + 1
+        self.walkable[index] = walkable
+        cluster = self._cluster_of(index)
+        self._intra.pop(cluster, None)
+
+        # 格子在区块边界上时，入口和对面区块的缓存也要重算
+        row, column = divmod(cluster, self.columns)
+        x0, y0, x1, y1 = self._bounds(cluster)
+        x, y = x + 1, y + 1
+        sides = []
+        if column > 0 and x == x0:
+            sides.append(cluster - 1)
+        if column < self.columns - 1 and x == x1 - 1:
+            sides.append(cluster + 1)
+        if row > 0 and y == y0:
+            sides.append(cluster - self.columns)
+        if row < self.rows - 1 and y == y1 - 1:
+            sides.append(cluster + self.columns)
+        for other in sides:
+            self._borders.pop((min(cluster, other), max(cluster, other)), None)
+            self._entrances.pop(cluster, None)
+            self._entrances.pop(other, None)
+            self._intra.pop(other, None)
+
+    # 查询
+    def _index(self, pos):
+        return (pos[1] + 1) * self.stride + pos[0] + 1
+
+    def _search(self, start, goal):
+        """抽象图上的 A*，返回 (步数, 抽象路线 [起点, 入口..., 终点]) 或 None"""
+        stride = self.stride
+        walkable = self.walkable
+        if not walkable[start] or not walkable[goal]:
+            return None
+        start_cluster = self._cluster_of(start)
+        goal_cluster = self._cluster_of(goal)
+        goal_y, goal_x = divmod(goal, stride)
+
+        # 起点和终点先在自己的区块内连到入口上
+        start_entrances = self._cluster_entrances(start_cluster)
+        start_distance, _ = self._bfs(start, start_cluster, set(start_entrances) | {goal})
+        goal_entrances = self._cluster_entrances(goal_cluster)
+        goal_distance, _ = self._bfs(goal, goal_cluster, set(goal_entrances))
+        to_goal = {entrance: goal_distance[entrance] for entrance in goal_entrances
+                   if entrance in goal_distance}
+
+        best = None  # (步数, 最后一个入口)，最后一个入口是 None 表示在区块内直接走到
+        if goal in start_distance:
+            best = (start_distance[goal], None)
+
+        g = {}
+        parent = {}
+        heap = []
+        for entrance in start_entrances:
+            if entrance in start_distance:
+                cost = start_distance[entrance]
+                g[entrance] = cost
+                parent[entrance] = start
+                y, x = divmod(entrance, stride)
+                heappush(heap, (cost + abs(x - goal_x) + abs(y - goal_y), cost, entrance))
+
+        searched = 0
+        while heap:
+            estimate, cost, node = heappop(heap)
+            if best is not None and estimate >= best[0]:
+                break
+            if cost > g[node]:
+                continue
+            searched += 1
+            if node in to_goal and (best is None or cost + to_goal[node] < best[0]):
+                best = (cost + to_goal[node], node)
+            for neighbor, step in self._cluster_edges(self._cluster_of(node))[node]:
+                new_cost = cost + step
+                if new_cost < g.get(neighbor, new_cost + 1):
+                    g[neighbor] = new_cost
+                    parent[neighbor] = node
+                    y, x = divmod(neighbor, stride)
+                    heappush(heap, (new_cost + abs(x - goal_x) + abs(y - goal_y), new_cost, neighbor))
+        self.searched = searched
+        if best is None:
+            return None
+        route = [goal]
+        node = best[1]
+        while node is not None and node != start:
+            route.append(node)
+            node = parent[node]
+        route.append(start)
+        route.reverse()
+        return best[0], route
+
+    def distance(self, start, goal):
+        """start 到 goal 的步数（不能穿过墙和没打开的门），走不到时返回 None"""
+        result = self._search(self._index(start), self._index(goal))
+        return None if result is None else result[0]
+
+    def find_path(self, start, goal):
+        """从 start 到 goal 的路径 [(x, y), ...]（包括两端），走不到时返回空列表"""
+        result = self._search(self._index(start), self._index(goal))
+        if result is None:
+            return []
+        route = result[1]
+        indices = [route[0]]
+        for a, b in zip(route, route[1:]):
+            if a == b:
+                continue
+            cluster = self._cluster_of(a)
+            if cluster != self._cluster_of(b):
+                indices.append(b)  # 跨过区块边界的一步
+                continue
+            # 只对路线经过的区块做细化
+            _, parent = self._bfs(a, cluster, goal=b)
+            segment = []
+            node = b
+            while node != a:
+                segment.append(node)
+                node = parent[node]
+            indices += segment[::-1]
+        stride = self.stride
+        return [(index % stride - 1, index // stride - 1) for index in indices]
@@ -0,0 +1,127 @@
+import mmap
+import struct
+
+import numpy as np
+
+from maze_grid import MazeGrid
+
+# 关卡包文件格式（所有整数都是小端序）：
+#
+#   文件头   MAGIC、版本号、关卡数量、偏移索引的位置
+#   关卡记录 每个关卡一条，依次排列
+#   偏移索引 关卡数量个 uint64，第 n 个是第 n 条关卡记录在文件中的位置
+#
+# 关卡记录：种子、宽、高、起点、终点、门的数量、钥匙的数量，
+# 然后是门和钥匙的坐标（每个坐标两个 uint16），最后是按行打包的墙的位图
+# （每行 ceil(width / 8) 字节，高位在前，1 表示墙）。
+# 偏移索引放在文件末尾，写入时不需要提前知道关卡数量。
+MAGIC = b"MZPK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIQ")  # MAGIC、版本号、保留、关卡数量、索引位置
+RECORD = struct.Struct("<QHHHHHHBB")  # 种子、宽、高、起点 x y、终点 x y、门数、钥匙数
+POINT = struct.Struct("<HH")
+
+
+def encode_level(level, seed=0):
+    """把关卡 (maze, start_pos, end_pos, doors, keys) 编码成一条关卡记录"""
+    maze, start_pos, end_pos, doors, keys = level
+    parts = [RECORD.pack(seed, maze.width, maze.height, start_pos[0], start_pos[1],
+                         end_pos[0], end_pos[1], len(doors), len(keys))]
+    parts += [POINT.pack(x, y) for x, y in doors]
+    parts += [POINT.pack(x, y) for x, y in keys]
+    parts.append(maze.packed_walls().tobytes())
+    return b"".join(parts)
+
+
+def decode_level(buffer, offset=0):
+    """从 buffer 的 offset 处读出一条关卡记录，返回 (seed, level)"""
+    seed, width, height, start_x, start_y, end_x, end_y, door_count, key_count = \
+        RECORD.unpack_from(buffer, offset)
+    offset += RECORD.size
+    points = [POINT.unpack_from(buffer, offset + i * POINT.size)
+              for i in range(door_count + key_count)]
+    offset += len(points) * POINT.size
+    row_bytes = (width + 7) // 8
+    bits = np.frombuffer(buffer, dtype=np.uint8, count=row_bytes * height, offset=offset)
+    maze = MazeGrid.from_packed_walls(bits.reshape(height, row_bytes), width, height)
+
+    doors = points[:door_count]
+    keys = points[door_count:]
+    for x, y in doors:
+        maze.set(x, y, 3)  # 3表示门
+    for x, y in keys:
+        maze.set(x, y, 2)  # 2表示钥匙
+    return seed, (maze, (start_x, start_y), (end_x, end_y), doors, keys)
+
+
+class LevelPackWriter:
+    """按顺序把关卡写入关卡包，关闭时写入偏移索引"""
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.offsets = []
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))  # 关闭时再补上数量和索引位置
+
+    def add(self, level, seed=0):
+        self.add_record(encode_level(level, seed))
+
+    def add_record(self, record):
+        """写入已经用 encode_level() 编码好的记录（可以在其他进程中编码）"""
+        self.offsets.append(self.file.tell())
+        self.file.write(record)
+
+    def close(self):
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        self.file.write(np.asarray(self.offsets, dtype="<u8").tobytes())
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, len(self.offsets), index_offset))
+        self.file.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LevelPack:
+    """通过 mmap 随机读取关卡包，打开和读取第 n 关都不需要读入整个文件"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, index_offset = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} 不是关卡包文件")
+        if version != VERSION:
+            raise ValueError(f"不支持的关卡包版本: {version}")
+        self._offsets = np.frombuffer(self._mmap, dtype="<u8", count=count, offset=index_offset)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, n):
+        """读取第 n 关，返回 (maze, start_pos, end_pos, doors, keys)"""
+        return self.read(n)[1]
+
+    def read(self, n):
+        """读取第 n 关，返回 (seed, level)"""
+        if not -len(self) <= n < len(self):
+            raise IndexError(f"关卡包中只有 {len(self)} 个关卡")
+        return decode_level(self._mmap, int(self._offsets[n]))
+
+    def close(self):
+        # 先释放指向 mmap 的数组，否则 mmap 无法关闭
+        self._offsets = None
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -4,6 +4,9 @@ import random
 import math
 import time
 from pathlib import Path
+import numpy as np
+from maze_gen import generate_maze, to_rows
+from maze_grid import MazeGrid, CandidateIndex
 
 # 初始化Pygame
 pygame.init()
@@ -33,6 +36,7 @@ CELL_SIZE = 40  # 增大格子尺寸以容纳更多细节
 MAZE_WIDTH = 25
 MAZE_HEIGHT = 15
 PIXEL_SCALE = 2  # 像素缩放比例，使图像更清晰
+MAZE_ALGORITHM = "dfs"  # 迷宫生成算法，见 maze_gen.GENERATORS
 
 # 创建游戏窗口
 WINDOW_WIDTH = MAZE_WIDTH * CELL_SIZE
@@ -365,63 +369,31 @@ def create_pixel_wall(x, y):
     return surface
 
 def generate_maze_dfs():
-    # 初始化迷宫为全墙
-    maze = [[1 for _ in range(MAZE_WIDTH)] for _ in range(MAZE_HEIGHT)]
-    
-    def get_neighbors(x, y, distance=2):
-        neighbors = []
-        for dx, dy in [(0, -distance), (distance, 0), (0, distance), (-distance, 0)]:
-            new_x, new_y = x + dx, y + dy
-            if (0 <= new_x < MAZE_WIDTH and 0 <= new_y < MAZE_HEIGHT and
-                    maze[new_y][new_x] == 1):
-                neighbors.append((new_x, new_y, dx, dy))
-        random.shuffle(neighbors)
-        return neighbors
-    
-    def carve_path(x, y):
-        maze[y][x] = 0
-        
-        neighbors = get_neighbors(x, y)
-        for next_x, next_y, dx, dy in neighbors:
-            # 在两个格子之间开一条路
-            maze[y + dy//2][x + dx//2] = 0
-            carve_path(next_x, next_y)
-    
-    # 从随机点开始生成迷宫
-    start_x = random.randrange(1, MAZE_WIDTH-1, 2)
-    start_y = random.randrange(1, MAZE_HEIGHT-1, 2)
-    carve_path(start_x, start_y)
-    
-    return maze
+    # 使用共享的生成算法注册表（默认深度优先搜索）
+    return to_rows(generate_maze(MAZE_ALGORITHM, MAZE_WIDTH, MAZE_HEIGHT), MAZE_WIDTH)
 
 def place_items(maze):
-    # 获取所有可用的空格
-    empty_cells = []
-    for y in range(MAZE_HEIGHT):
-        for x in range(MAZE_WIDTH):
-            if maze[y][x] == 0:
-                empty_cells.append((x, y))
+    grid = MazeGrid.from_rows(maze)
+    # 通道格子和可以放门的墙只扫描一次，放置钥匙和门时增量更新
+    index = CandidateIndex(grid, door_rule='adjacent')
     
-    if len(empty_cells) < 7:  # 需要至少7个空格（起点、终点、4个钥匙、1个怪物）
+    if len(index.floor) < 7:  # 需要至少7个空格（起点、终点、4个钥匙、1个怪物）
         return None, None, None, None
     
     # 随机选择起点和终点
-    start_pos = random.choice(empty_cells)
-    empty_cells.remove(start_pos)
+    start_pos = index.floor.choice(random)
+    index.reserve(start_pos)
     
-    # 确保终点和起点距离足够远
-    end_pos = None
+    # 确保终点和起点距离足够远（按行优先取第一个满足条件的通道）
     min_distance = (MAZE_WIDTH + MAZE_HEIGHT) // 3
+    ys, xs = np.ogrid[:MAZE_HEIGHT, :MAZE_WIDTH]
+    far = grid.floor_mask() & (np.abs(xs - start_pos[0]) + np.abs(ys - start_pos[1]) >= min_distance)
     
-    for pos in empty_cells:
-        dist = abs(pos[0] - start_pos[0]) + abs(pos[1] - start_pos[1])
-        if dist >= min_distance:
-            end_pos = pos
-            empty_cells.remove(pos)
-            break
-    
-    if not end_pos:
+    if not far.any():
         return None, None, None, None
+    end_y, end_x = divmod(int(np.argmax(far)), MAZE_WIDTH)
+    end_pos = (end_x, end_y)
+    index.reserve(end_pos)
     
     # 放置钥匙和门
     keys = []
@@ -429,46 +401,24 @@ def place_items(maze):
     
     # 尝试放置4对钥匙和门
     for _ in range(4):
-        if len(empty_cells) < 2:
+        if len(index.floor) < 2:
             break
             
         # 放置钥匙
-        key_pos = random.choice(empty_cells)
-        empty_cells.remove(key_pos)
+        key_pos = index.floor.choice(random)
         keys.append(key_pos)
-        maze[key_pos[1]][key_pos[0]] = 2  # 2表示钥匙
-        
-        # 找到合适的门的位置（必须是墙）
-        wall_cells = []
-        for y in range(MAZE_HEIGHT):
-            for x in range(MAZE_WIDTH):
-                if maze[y][x] == 1:
-                    # 检查是否至少有一个相邻的通道
-                    has_path = False
-                    for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-                        nx, ny = x + dx, y + dy
-                        if (0 <= nx < MAZE_WIDTH and 0 <= ny < MAZE_HEIGHT and
-                                maze[ny][nx] == 0):
-                            has_path = True
-                            break
-                    if has_path:
-                        wall_cells.append((x, y))
+        index.place(key_pos[0], key_pos[1], 2)  # 2表示钥匙
         
-        if wall_cells:
-            door_pos = random.choice(wall_cells)
+        # 门必须放在墙上，且至少有一个相邻的通道
+        if len(index.doors) > 0:
+            door_pos = index.doors.choice(random)
             doors.append(door_pos)
-            maze[door_pos[1]][door_pos[0]] = 3  # 3表示门
-    
-    # 放置怪物
-    monster_positions = []
-    num_monsters = min(3, len(empty_cells))  # 最多3个怪物
-    for _ in range(num_monsters):
-        if empty_cells:
-            monster_pos = random.choice(empty_cells)
-            empty_cells.remove(monster_pos)
-            monster_positions.append(monster_pos)
-    
-    return start_pos, end_pos, monster_positions, maze
+            index.place(door_pos[0], door_pos[1], 3)  # 3表示门
+    
+    # 放置怪物（最多3个）
+    monster_positions = index.floor.sample(random, min(3, len(index.floor)))
+    
+    return start_pos, end_pos, monster_positions, grid.rows()
 
 def initialize_game():
     while True:
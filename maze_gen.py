@@ -0,0 +1,369 @@
+import random
+from collections import deque
+from itertools import permutations
+
+# 迷宫格子类型（与 game_test.py 中的编号一致）
+PATH = 0  # 通道
+WALL = 1  # 墙
+KEY = 2  # 钥匙
+DOOR = 3  # 门
+
+# 在迷宫四周额外留出的哨兵格子宽度（挖路时一次跨两格，所以留两格就不用检查边界）
+BORDER = 2
+
+# 四个方向的全部 24 种排列，挖路时每进入一个格子就随机选一种
+DIRECTION_ORDERS = list(permutations(range(4)))
+
+# 把随机字节映射到 0~23；240~255 直接丢掉，保证每种排列的概率相同
+_BYTE_TO_ORDER = bytes(b % 24 for b in range(256))
+_REJECTED_BYTES = bytes(range(240, 256))
+
+# 迷宫生成算法注册表：名字 -> 函数(width, height, rng)，函数返回按行展开的 bytearray
+GENERATORS = {}
+
+
+def register_generator(name):
+    """把迷宫生成函数按名字注册到 GENERATORS（装饰器）"""
+    def decorator(func):
+        GENERATORS[name] = func
+        return func
+    return decorator
+
+
+def generate_maze(algorithm, width, height, rng=random):
+    """按名字选择生成算法，返回按行展开的 bytearray（长度 width*height）"""
+    if algorithm not in GENERATORS:
+        raise ValueError(f"未知的迷宫生成算法: {algorithm}（可选: {', '.join(GENERATORS)}）")
+    return GENERATORS[algorithm](width, height, rng)
+
+
+def random_orders(rng, count):
+    """一次性生成 count 个 0~23 的随机数（方向排列的编号）"""
+    orders = b''
+    while len(orders) < count:
+        need = count - len(orders)
+        size = need + need // 8 + 16  # 多取一点，补上被丢掉的字节
+        orders += rng.getrandbits(8 * size).to_bytes(size, 'little').translate(
+            _BYTE_TO_ORDER, _REJECTED_BYTES)
+    return orders[:count]
+
+
+def new_grid(width, height):
+    """创建带哨兵边框的扁平数组，内部全部是墙，返回 (数组, 每行长度)"""
+    stride = width + 2 * BORDER
+    # 哨兵格子填 0：挖路时只会挖值为 1 的墙，所以永远不会越界
+    grid = bytearray(stride * (height + 2 * BORDER))
+    wall_row = bytes([WALL]) * width
+    for y in range(height):
+        row_start = (y + BORDER) * stride + BORDER
+        grid[row_start:row_start + width] = wall_row
+    return grid, stride
+
+
+def crop_grid(grid, width, height):
+    """去掉哨兵边框，返回按行展开的 bytearray（长度 width*height）"""
+    stride = width + 2 * BORDER
+    cells = bytearray()
+    for y in range(height):
+        row_start = (y + BORDER) * stride + BORDER
+        cells += grid[row_start:row_start + width]
+    return cells
+
+
+@register_generator('dfs')
+def carve_dfs(width, height, rng=random):
+    """使用显式栈的深度优先搜索挖出迷宫，返回按行展开的 bytearray（长度 width*height）
+
+    不使用递归，所以迷宫再大也不会超过 Python 的递归深度限制；相同的随机种子总是得到相同的迷宫。
+    """
+    grid, stride = new_grid(width, height)
+
+    # 方向：下、右、上、左（一次跨两格）
+    offsets = [2 * stride, 2, -2 * stride, -2]
+    orders = [tuple(offsets[i] for i in order) for order in DIRECTION_ORDERS]
+
+    # 从随机位置开始生成迷宫
+    start_x = rng.randrange(1, width - 1, 2)
+    start_y = rng.randrange(1, height - 1, 2)
+
+    # 每个奇数坐标的格子正好进入一次，提前为它们生成好方向顺序
+    draws = random_orders(rng, (width // 2) * (height // 2))
+
+    pos = (start_y + BORDER) * stride + start_x + BORDER
+    grid[pos] = PATH
+    order = draws[0]
+    next_draw = 1
+    # 栈里每一项是 位置 << 5 | 方向排列编号
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    while True:
+        for offset in orders[order]:
+            if grid[pos + offset] == WALL:
+                grid[pos + offset // 2] = PATH  # 打通中间的墙
+                push(pos << 5 | order)
+                pos += offset
+                grid[pos] = PATH
+                order = draws[next_draw]
+                next_draw += 1
+                break
+        else:
+            # 四个方向都走不通，回溯（之前试过的方向已经不是墙了，重新检查一遍也没关系）
+            if not stack:
+                break
+            item = pop()
+            pos = item >> 5
+            order = item & 31
+
+    return crop_grid(grid, width, height)
+
+
+# 下面的算法都把迷宫看成 (width // 2) x (height // 2) 个房间（奇数坐标的格子），
+# 房间编号 cell = row * cols + col；方向依次为 右、下、左、上
+def _room_grid(width, height):
+    """创建全是墙、只挖开了房间的格子数组，返回 (格子数组, 房间列数, 房间行数)"""
+    cells = bytearray([WALL]) * (width * height)
+    cols, rows = width // 2, height // 2
+    for row in range(rows):
+        row_start = (2 * row + 1) * width + 1
+        cells[row_start:row_start + 2 * cols:2] = bytes(cols)
+    return cells, cols, rows
+
+
+def _room_position(width, cols, cell):
+    """房间编号 -> 在格子数组中的下标"""
+    row, col = divmod(cell, cols)
+    return (2 * row + 1) * width + 2 * col + 1
+
+
+def _room_neighbors(cols, rows, cell):
+    """返回房间在四个方向上的相邻房间编号，越界的方向为 None"""
+    row, col = divmod(cell, cols)
+    return (cell + 1 if col + 1 < cols else None,
+            cell + cols if row + 1 < rows else None,
+            cell - 1 if col > 0 else None,
+            cell - cols if row > 0 else None)
+
+
+@register_generator('kruskal')
+def carve_kruskal(width, height, rng=random):
+    """随机 Kruskal 算法：按随机顺序拆墙，用并查集（路径压缩）保证不产生环"""
+    cells, cols, rows = _room_grid(width, height)
+    count = cols * rows
+    parent = list(range(count))
+
+    def find(cell):
+        root = cell
+        while parent[root] != root:
+            root = parent[root]
+        while parent[cell] != root:  # 路径压缩
+            parent[cell], cell = root, parent[cell]
+        return root
+
+    # 每堵墙记为 房间编号 * 2 + 方向（0 右侧的墙，1 下方的墙）
+    walls = [cell * 2 for cell in range(count) if cell % cols + 1 < cols]
+    walls += [cell * 2 + 1 for cell in range(count - cols)]
+    rng.shuffle(walls)
+
+    merged = 0
+    for wall in walls:
+        cell = wall >> 1
+        other = cell + (cols if wall & 1 else 1)
+        root_a, root_b = find(cell), find(other)
+        if root_a != root_b:
+            parent[root_b] = root_a
+            cells[_room_position(width, cols, cell) + (width if wall & 1 else 1)] = PATH
+            merged += 1
+            if merged == count - 1:  # 已经连成一棵树
+                break
+    return cells
+
+
+@register_generator('prim')
+def carve_prim(width, height, rng=random):
+    """随机 Prim 算法：从一个房间开始，每次随机拆掉边界上的一堵墙"""
+    cells, cols, rows = _room_grid(width, height)
+    count = cols * rows
+    wall_offsets = (1, width, -1, -width)
+    visited = bytearray(count)
+    frontier = []  # 边界上的墙，记为 房间编号 * 4 + 方向
+
+    def visit(cell):
+        visited[cell] = 1
+        for direction, neighbor in enumerate(_room_neighbors(cols, rows, cell)):
+            if neighbor is not None and not visited[neighbor]:
+                frontier.append(cell * 4 + direction)
+
+    visit(rng.randrange(count))
+    while frontier:
+        # 随机取出一堵墙（和末尾交换后弹出，O(1)）
+        index = rng.randrange(len(frontier))
+        frontier[index], frontier[-1] = frontier[-1], frontier[index]
+        wall = frontier.pop()
+        cell, direction = wall >> 2, wall & 3
+        neighbor = _room_neighbors(cols, rows, cell)[direction]
+        if not visited[neighbor]:
+            cells[_room_position(width, cols, cell) + wall_offsets[direction]] = PATH
+            visit(neighbor)
+    return cells
+
+
+@register_generator('wilson')
+def carve_wilson(width, height, rng=random):
+    """Wilson 算法：用擦除环路的随机游走连接到已有的树，得到均匀分布的迷宫"""
+    cells, cols, rows = _room_grid(width, height)
+    count = cols * rows
+    wall_offsets = (1, width, -1, -width)
+    in_tree = bytearray(count)
+    exit_direction = bytearray(count)  # 随机游走时最后一次离开每个房间的方向
+    in_tree[rng.randrange(count)] = 1
+
+    for start in range(count):
+        if in_tree[start]:
+            continue
+        # 随机游走直到碰到树；同一个房间再次离开时直接覆盖方向，相当于擦掉了环路
+        cell = start
+        while not in_tree[cell]:
+            neighbors = _room_neighbors(cols, rows, cell)
+            direction = rng.randrange(4)
+            while neighbors[direction] is None:
+                direction = rng.randrange(4)
+            exit_direction[cell] = direction
+            cell = neighbors[direction]
+        # 沿记录的方向重新走一遍，把这条路径加入树中
+        cell = start
+        while not in_tree[cell]:
+            direction = exit_direction[cell]
+            in_tree[cell] = 1
+            cells[_room_position(width, cols, cell) + wall_offsets[direction]] = PATH
+            cell = _room_neighbors(cols, rows, cell)[direction]
+    return cells
+
+
+def eller_rows(width, rng=random, height=None):
+    """Eller 算法的流式版本：逐行产生迷宫（每行是长度为 width 的 bytearray）
+
+    只记住当前一行房间所属的集合，内存占用是 O(width)。height 为 None 时无限地生成下去
+    （用于无限下降模式）；否则最后一行会把所有集合合并，生成的行数正好是 height。
+    """
+    cols = width // 2
+    rows = None if height is None else height // 2
+    yield bytearray([WALL]) * width  # 顶部边界
+
+    sets = list(range(cols))  # 当前行每个房间所属的集合
+    next_set = cols
+    row = 0
+    while True:
+        last_row = rows is not None and row == rows - 1
+        room_row = bytearray([WALL]) * width
+        room_row[1:1 + 2 * cols:2] = bytes(cols)
+
+        # 随机合并相邻的不同集合（最后一行必须全部合并）
+        members = {}
+        for col, set_id in enumerate(sets):
+            members.setdefault(set_id, []).append(col)
+        for col in range(cols - 1):
+            set_a, set_b = sets[col], sets[col + 1]
+            if set_a != set_b and (last_row or rng.random() < 0.5):
+                room_row[2 * col + 2] = PATH
+                # 把较小的集合并入较大的集合
+                if len(members[set_a]) < len(members[set_b]):
+                    set_a, set_b = set_b, set_a
+                for member in members.pop(set_b):
+                    sets[member] = set_a
+                    members[set_a].append(member)
+        yield room_row
+        if last_row:
+            if 2 * rows + 1 == height:
+                yield bytearray([WALL]) * width  # 底部边界
+            return
+
+        # 每个集合至少向下打通一次，没有向下打通的房间在下一行换成新集合
+        wall_row = bytearray([WALL]) * width
+        next_sets = [-1] * cols
+        for set_id, columns in members.items():
+            down = [col for col in columns if rng.random() < 0.5]
+            if not down:
+                down = [rng.choice(columns)]
+            for col in down:
+                wall_row[2 * col + 1] = PATH
+                next_sets[col] = set_id
+        for col in range(cols):
+            if next_sets[col] < 0:
+                next_sets[col] = next_set
+                next_set += 1
+        sets = next_sets
+        yield wall_row
+        row += 1
+
+
+@register_generator('eller')
+def carve_eller(width, height, rng=random):
+    """Eller 算法：逐行生成，每行只需要记住各房间所属的集合"""
+    cells = bytearray()
+    for row in eller_rows(width, rng, height):
+        cells += row
+    return cells
+
+
+class MazeWindow:
+    """无限下降模式使用的迷宫窗口：内存中只保留最近的 size 行，玩家往下走时再生成新行"""
+
+    def __init__(self, width, size, rng=random, height=None):
+        self.width = width
+        self.size = size
+        self.top = 0  # 窗口第一行在整个迷宫中的行号
+        self.rows = deque(maxlen=size)
+        self._source = eller_rows(width, rng, height)
+        self.ensure(size - 1)
+
+    @property
+    def bottom(self):
+        """窗口最后一行的下一行行号"""
+        return self.top + len(self.rows)
+
+    def ensure(self, y):
+        """保证第 y 行已经生成，必要时丢掉窗口顶部的旧行；迷宫已经结束时返回 False"""
+        while self.bottom <= y:
+            row = next(self._source, None)
+            if row is None:
+                return False
+            if len(self.rows) == self.size:
+                self.top += 1
+            self.rows.append(row)
+        return True
+
+    def follow(self, y):
+        """玩家走到第 y 行时调用：让玩家下方始终有半个窗口的迷宫"""
+        return self.ensure(y + self.size // 2)
+
+    def __contains__(self, y):
+        return self.top <= y < self.bottom
+
+    def row(self, y):
+        """返回第 y 行（可以直接修改，比如拾取钥匙、打开门）"""
+        if y not in self:
+            raise IndexError(f"第 {y} 行不在窗口内（{self.top}~{self.bottom - 1}）")
+        return self.rows[y - self.top]
+
+    def cell(self, x, y):
+        return self.row(y)[x]
+
+
+@register_generator('binary_tree')
+def carve_binary_tree(width, height, rng=random):
+    """二叉树算法：每个房间随机向上或向左打通，速度最快但有明显的方向偏好"""
+    cells, cols, rows = _room_grid(width, height)
+    for cell in range(cols * rows):
+        row, col = divmod(cell, cols)
+        position = (2 * row + 1) * width + 2 * col + 1
+        if row > 0 and (col == 0 or rng.random() < 0.5):
+            cells[position - width] = PATH
+        elif col > 0:
+            cells[position - 1] = PATH
+    return cells
+
+
+def to_rows(cells, width):
+    """把按行展开的格子数组转换成游戏使用的二维列表"""
+    return [list(cells[i:i + width]) for i in range(0, len(cells), width)]
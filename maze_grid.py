@@ -0,0 +1,193 @@
+import numpy as np
+
+from maze_gen import PATH, WALL
+
+
+class MazeGrid:
+    """用 NumPy uint8 数组保存的迷宫
+
+    cells 是形状为 (height, width) 的数组（注意是 [y, x] 顺序），用于整张迷宫的向量化查询；
+    它和内部的 bytearray 共享同一块内存，单个格子的读写走 bytearray，比 NumPy 标量索引快得多。
+    2000x2000 的迷宫只占 4MB，打包成墙的位图后只要 0.5MB。
+    """
+
+    def __init__(self, cells, width, height):
+        if len(cells) != width * height:
+            raise ValueError(f"格子数量 {len(cells)} 与迷宫大小 {width}x{height} 不符")
+        self.width = width
+        self.height = height
+        self._flat = bytearray(cells)
+        self.cells = np.frombuffer(self._flat, dtype=np.uint8).reshape(height, width)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """从二维列表（旧的 maze 格式）创建"""
+        height, width = len(rows), len(rows[0])
+        return cls(bytes(value for row in rows for value in row), width, height)
+
+    @classmethod
+    def from_packed_walls(cls, bits, width, height):
+        """从 packed_walls() 得到的位图还原迷宫（只有墙和通道）"""
+        walls = np.unpackbits(np.asarray(bits, dtype=np.uint8), axis=1, count=width)
+        return cls(walls[:height].astype(np.uint8).tobytes(), width, height)
+
+    def __reduce__(self):
+        # cells 和 _flat 共享内存，pickle 时只保存一份数据
+        return MazeGrid, (bytes(self._flat), self.width, self.height)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get(self, x, y):
+        """读取 (x, y) 处的格子（调用前需要自己检查边界）"""
+        return self._flat[y * self.width + x]
+
+    def set(self, x, y, value):
+        self._flat[y * self.width + x] = value
+
+    def rows(self):
+        """转换成二维列表（旧的 maze 格式）"""
+        return self.cells.tolist()
+
+    def packed_walls(self):
+        """把墙打包成每格 1 位的位图，形状为 (height, ceil(width / 8))"""
+        return np.packbits(self.cells == WALL, axis=1)
+
+    # 整张迷宫的向量化查询，返回形状为 (height, width) 的布尔数组
+    def floor_mask(self):
+        """所有通道格子"""
+        return self.cells == PATH
+
+    def door_candidate_mask(self, rule='opposite'):
+        """可以放门的墙
+
+        rule='opposite'：不在边界上，并且上下两边或左右两边都是通道（game_test.py 的规则）；
+        rule='adjacent'：四周至少有一个通道（maze_game_v2.py 的规则）。
+        """
+        cells = self.cells
+        floor = cells == PATH
+        if rule == 'opposite':
+            mask = np.zeros(cells.shape, dtype=bool)
+            vertical = floor[:-2, 1:-1] & floor[2:, 1:-1]
+            horizontal = floor[1:-1, :-2] & floor[1:-1, 2:]
+            mask[1:-1, 1:-1] = (cells[1:-1, 1:-1] == WALL) & (vertical | horizontal)
+            return mask
+        if rule == 'adjacent':
+            padded = np.pad(floor, 1)
+            near_floor = padded[:-2, 1:-1] | padded[2:, 1:-1] | padded[1:-1, :-2] | padded[1:-1, 2:]
+            return (cells == WALL) & near_floor
+        raise ValueError(f"未知的放门规则: {rule}")
+
+    def is_door_candidate(self, x, y, rule='opposite'):
+        """单个格子版本的 door_candidate_mask"""
+        if self.get(x, y) != WALL:
+            return False
+        if rule == 'opposite':
+            if not (0 < x < self.width - 1 and 0 < y < self.height - 1):
+                return False
+            return ((self.get(x, y - 1) == PATH and self.get(x, y + 1) == PATH) or
+                    (self.get(x - 1, y) == PATH and self.get(x + 1, y) == PATH))
+        return any(self.in_bounds(nx, ny) and self.get(nx, ny) == PATH
+                   for nx, ny in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)))
+
+
+def positions(mask):
+    """把布尔数组里为 True 的格子转换成 [(x, y), ...] 列表"""
+    ys, xs = np.nonzero(mask)
+    return list(zip(xs.tolist(), ys.tolist()))
+
+
+def random_position(mask, rng):
+    """从布尔数组里为 True 的格子中随机选一个 (x, y)"""
+    flat = np.flatnonzero(mask)
+    y, x = divmod(int(flat[rng.randrange(len(flat))]), mask.shape[1])
+    return x, y
+
+
+class PositionPool:
+    """一组格子的集合，加入、删除和随机抽取都是 O(1)
+
+    items[:size] 保存格子在扁平数组中的下标，slots 记录每个格子在 items 中的位置（-1 表示不在集合中）。
+    """
+
+    def __init__(self, mask):
+        self.width = mask.shape[1]
+        flat = np.flatnonzero(mask)
+        self.size = len(flat)
+        self.items = np.zeros(mask.size, dtype=np.int32)
+        self.items[:self.size] = flat
+        self.slots = np.full(mask.size, -1, dtype=np.int32)
+        self.slots[flat] = np.arange(self.size, dtype=np.int32)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, pos):
+        return self.slots[pos[1] * self.width + pos[0]] >= 0
+
+    def _position(self, slot):
+        y, x = divmod(int(self.items[slot]), self.width)
+        return x, y
+
+    def add(self, pos):
+        index = pos[1] * self.width + pos[0]
+        if self.slots[index] < 0:
+            self.items[self.size] = index
+            self.slots[index] = self.size
+            self.size += 1
+
+    def discard(self, pos):
+        index = pos[1] * self.width + pos[0]
+        slot = self.slots[index]
+        if slot >= 0:
+            # 用最后一个元素填补空位
+            self.size -= 1
+            last = self.items[self.size]
+            self.items[slot] = last
+            self.slots[last] = slot
+            self.slots[index] = -1
+
+    def update(self, pos, present):
+        if present:
+            self.add(pos)
+        else:
+            self.discard(pos)
+
+    def choice(self, rng):
+        return self._position(rng.randrange(self.size))
+
+    def sample(self, rng, k):
+        """不重复地随机抽取 k 个格子"""
+        return [self._position(slot) for slot in rng.sample(range(self.size), k)]
+
+    def positions(self):
+        return [self._position(slot) for slot in range(self.size)]
+
+
+class CandidateIndex:
+    """放置门和钥匙用的候选格子索引
+
+    创建时用数组运算扫描一次整张迷宫，之后每次通过 place() 修改格子只重新检查它和四个邻居，
+    所以放多少个门和钥匙都不需要再扫描整张迷宫。
+    """
+
+    def __init__(self, grid, door_rule='opposite'):
+        self.grid = grid
+        self.door_rule = door_rule
+        self.floor = PositionPool(grid.floor_mask())  # 通道
+        self.doors = PositionPool(grid.door_candidate_mask(door_rule))  # 可以放门的墙
+        self.reserved = set()  # 起点、终点等不能再放东西的通道
+
+    def reserve(self, pos):
+        """把通道格子 pos 从候选中永久去掉（格子本身仍然是通道）"""
+        self.reserved.add(pos)
+        self.floor.discard(pos)
+
+    def place(self, x, y, value):
+        """把 (x, y) 改成 value（门、钥匙等），并更新受影响的候选格子"""
+        grid = self.grid
+        grid.set(x, y, value)
+        for nx, ny in ((x, y), (x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+            if grid.in_bounds(nx, ny):
+                self.floor.update((nx, ny), grid.get(nx, ny) == PATH and (nx, ny) not in self.reserved)
+                self.doors.update((nx, ny), grid.is_door_candidate(nx, ny, self.door_rule))
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import pickle
+import random
+
+from distance_field import distance_map
+from maze_gen import generate_maze
+from maze_grid import MazeGrid, CandidateIndex, random_position
+from maze_solver import level_par
+
+# 关卡生成逻辑改变时加一，让旧的缓存失效；改 generate_level() 的同一个提交里就要改这里
+# 1：最早的版本
+# 2：终点只选在起点不开门能走到的地方（之前无解时会挪动终点，也改变了生成结果）
+LEVEL_VERSION = 2
+
+# 关卡缓存目录，可以用环境变量指定；默认放在用户目录下，不从当前目录读取别人放的 pickle 文件
+CACHE_DIR = os.environ.get("MAZE_LEVEL_CACHE",
+                           os.path.join(os.path.expanduser("~"), ".cache", "maze-game", "levels"))
+
+# 缓存文件写了一半、被改坏或者格式过时时 pickle.loads 可能抛出的异常
+CORRUPT_ERRORS = (pickle.UnpicklingError, EOFError, AttributeError, ImportError,
+                  IndexError, TypeError, ValueError)
+
+
+def generate_level(seed, width, height, algorithm='dfs'):
+    """用独立的随机数流生成关卡，相同的参数总是得到相同的关卡
+
+    返回 (maze, start_pos, end_pos, doors, keys)，与 game_test.generate_maze_dfs() 相同。
+    """
+    rng = random.Random(seed)
+    maze = MazeGrid(generate_maze(algorithm, width, height, rng), width, height)
+
+    # 通道格子和可以放门的墙只扫描一次，放置门和钥匙时增量更新
+    index = CandidateIndex(maze)
+
+    # 随机选择起点和终点
+    start_pos = index.floor.choice(rng)
+
+    # 确保终点离起点足够远（按实际要走的步数算）；终点只从起点不开门能走到的格子中选，
+    # 所以关卡一定有解
+    distance = distance_map(maze, start_pos)
+    end_pos = choose_end(maze, distance, width // 2, rng)
+
+    # 放置4个门和4个钥匙
+    doors = []
+    keys = []
+
+    # 随机选择4个门的位置（必须在墙上，且上下或左右两边都是通道）
+    if len(index.doors) >= 4:
+        for x, y in index.doors.sample(rng, 4):
+            index.place(x, y, 3)  # 3表示门
+            doors.append((x, y))
+
+    # 在通道上放置4个钥匙（不放在起点和终点）
+    index.reserve(start_pos)
+    index.reserve(end_pos)
+    if len(index.floor) >= 4:
+        for x, y in index.floor.sample(rng, 4):
+            index.place(x, y, 2)  # 2表示钥匙
+            keys.append((x, y))
+
+    return maze, start_pos, end_pos, doors, keys
+
+
+def choose_end(maze, distance, min_distance, rng):
+    """在离起点超过 min_distance 步的通道中随机选择终点，没有的话选最远的格子"""
+    far = maze.floor_mask() & (distance > min_distance)
+    if far.any():
+        return random_position(far, rng)
+    return random_position(distance == distance.max(), rng)
+
+
+def level_key(seed, width, height, algorithm):
+    """关卡参数的内容哈希，用作缓存文件名"""
+    text = f"{LEVEL_VERSION}:{seed}:{width}:{height}:{algorithm}"
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class LevelCache:
+    """按参数哈希保存在磁盘上的关卡缓存，内存中也保留最近用过的关卡
+
+    缓存里存的是 pickle 后的字节串，每次读取都会得到一份新的关卡（游戏会修改迷宫，不能共享）。
+    """
+
+    def __init__(self, directory=CACHE_DIR, memory_size=16):
+        self.directory = directory
+        self.memory_size = memory_size
+        self._memory = {}  # 哈希 -> pickle 字节串（按使用顺序排列）
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".level")
+
+    def _remember(self, key, data):
+        self._memory.pop(key, None)
+        self._memory[key] = data
+        if len(self._memory) > self.memory_size:
+            del self._memory[next(iter(self._memory))]
+
+    def load(self, seed, width, height, algorithm='dfs'):
+        """读取关卡；内存和磁盘中都没有时生成一个并写入缓存"""
+        key = level_key(seed, width, height, algorithm)
+        data = self._memory.get(key)
+        if data is None:
+            data = self._read(key)
+        if data is None:
+            # 没有缓存或者缓存文件坏了：重新生成，并覆盖坏文件
+            data = pickle.dumps(generate_level(seed, width, height, algorithm),
+                                pickle.HIGHEST_PROTOCOL)
+            self._save(key, data)
+        self._remember(key, data)
+        return pickle.loads(data)
+
+    def _read(self, key):
+        """从磁盘读取关卡的 pickle 字节串，文件不存在或者解不开时返回 None"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            pickle.loads(data)  # 先解一次，坏文件当作没有缓存
+        except OSError:
+            return None
+        except CORRUPT_ERRORS as e:
+            print(f"Ignoring corrupt level cache {path}: {e!r}")
+            return None
+        return data
+
+    def _save(self, key, data):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再改名，避免另一个进程读到写了一半的文件
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            # 网页版等不能写文件的环境下只使用内存缓存
+            print(f"Error saving level cache: {e}")
+
+
+level_cache = LevelCache()
+
+
+def load_level(seed, width, height, algorithm='dfs'):
+    """从默认缓存读取关卡，返回 (maze, start_pos, end_pos, doors, keys)"""
+    return level_cache.load(seed, width, height, algorithm)
+
+
+def check_level(level, min_path_length=0):
+    """检查关卡能否通关、质量是否合格；合格时返回 None，否则返回原因"""
+    maze, start_pos, end_pos, doors, keys = level
+    if len(doors) != 4 or len(keys) != 4:
+        return "门或钥匙数量不足"
+    par = level_par(level)
+    if par is None:
+        return "无法到达终点"
+    if par < min_path_length:
+        return "起点离终点太近"
+    return None
@@ -0,0 +1,103 @@
+import heapq
+from collections import deque
+
+import numpy as np
+
+from maze_grid import positions
+
+# 求解时的每个状态是（所在位置，拿到的钥匙，打开的门），钥匙和门都用位掩码表示。
+# 任何一把钥匙都能开任何一扇门，开门后钥匙用掉，所以手里的钥匙数
+# = 初始钥匙数 + 拿到的钥匙数 - 打开的门数。
+#
+# 直接在格子上搜索状态太多，这里先把起点、终点、钥匙和门当作节点，
+# 用 BFS 求出节点之间不经过其他钥匙和门的最短距离（经过钥匙或门的路线
+# 可以拆成两段），再在这张小图上用 Dijkstra 搜索状态。
+
+
+def stop_distances(passable, stops, stride, source, targets):
+    """从 source 出发的 BFS，遇到 stops 中的格子（钥匙和门）只进入不穿过，返回 {目标: 距离}
+
+    passable 是四周补了一圈墙的迷宫，所以不用检查边界；targets 里要包括 source。
+    """
+    distance = [-1] * len(passable)
+    distance[source] = 0
+    found = {}
+    remaining = len(targets) - 1
+    queue = deque([source])
+    while queue and remaining:
+        index = queue.popleft()
+        step = distance[index]
+        if index in targets and index != source:
+            found[index] = step
+            remaining -= 1
+            if index in stops:
+                continue
+        step += 1
+        for neighbor in (index - stride, index + stride, index - 1, index + 1):
+            if passable[neighbor] and distance[neighbor] < 0:
+                distance[neighbor] = step
+                queue.append(neighbor)
+    return found
+
+
+def solve_level(maze, start, end, keys_held=0):
+    """按当前迷宫（2 是钥匙，3 是门）求从 start 到 end 的最少步数，走不到时返回 None
+
+    会考虑拿钥匙开门抄近路，也会考虑门必须用钥匙才能打开。
+    """
+    cells = maze.cells
+    stride = maze.width + 2
+    # 门也当作可以进入，能不能开在状态搜索里判断
+    passable = np.pad(cells != 1, 1).reshape(-1).tobytes()
+    key_cells = [(y + 1) * stride + x + 1 for x, y in positions(cells == 2)]
+    door_cells = [(y + 1) * stride + x + 1 for x, y in positions(cells == 3)]
+    start_index = (start[1] + 1) * stride + start[0] + 1
+    end_index = (end[1] + 1) * stride + end[0] + 1
+    if start_index == end_index:
+        return 0
+
+    # 节点：0 起点，1 终点，然后是钥匙和门
+    nodes = [start_index, end_index] + key_cells + door_cells
+    node_of = {index: node for node, index in enumerate(nodes)}
+    stops = set(key_cells) | set(door_cells)
+    targets = set(nodes)
+    edges = []
+    for node, index in enumerate(nodes):
+        if node == 1:
+            edges.append(())  # 到终点就结束了
+            continue
+        found = stop_distances(passable, stops, stride, index, targets)
+        edges.append(tuple((node_of[target], distance) for target, distance in found.items()))
+
+    first_key = 2
+    first_door = 2 + len(key_cells)
+    best = {(0, 0, 0): 0}
+    heap = [(0, 0, 0, 0)]  # (步数, 节点, 拿到的钥匙, 打开的门)
+    while heap:
+        cost, node, collected, opened = heapq.heappop(heap)
+        if node == 1:
+            return cost
+        if cost > best[node, collected, opened]:
+            continue
+        for target, distance in edges[node]:
+            new_collected, new_opened = collected, opened
+            if target >= first_door:
+                bit = 1 << (target - first_door)
+                if not opened & bit:
+                    if keys_held + bin(collected).count("1") - bin(opened).count("1") <= 0:
+                        continue  # 没有钥匙开不了门
+                    new_opened = opened | bit
+            elif target >= first_key:
+                new_collected = collected | 1 << (target - first_key)
+            state = (target, new_collected, new_opened)
+            new_cost = cost + distance
+            if new_cost < best.get(state, new_cost + 1):
+                best[state] = new_cost
+                heapq.heappush(heap, (new_cost, target, new_collected, new_opened))
+    return None
+
+
+def level_par(level):
+    """关卡的标准步数（par）：从起点到终点的最少步数，无解时返回 None"""
+    maze, start_pos, end_pos, doors, keys = level
+    return solve_level(maze, start_pos, end_pos)
@@ -0,0 +1,131 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count
+
+from level_pack import LevelPackWriter, encode_level
+from maze_gen import GENERATORS
+from maze_level import generate_level, check_level
+
+# 连续这么多个种子都不合格时放弃（参数太苛刻，比如迷宫太小放不下门，或者要求的步数太多）
+MAX_REJECTIONS = 10000
+
+
+def build_levels(seeds, width, height, algorithm, min_path_length):
+    """在子进程中生成、检查并编码一批关卡，返回 [(种子, 关卡记录或 None, 不合格原因), ...]"""
+    results = []
+    for seed in seeds:
+        level = generate_level(seed, width, height, algorithm)
+        reason = check_level(level, min_path_length)
+        record = encode_level(level, seed) if reason is None else None
+        results.append((seed, record, reason))
+    return results
+
+
+def pack_levels(output, level_count, width, height, algorithm, start_seed=0,
+                workers=None, chunk_size=64, min_path_length=0, max_rejections=MAX_REJECTIONS):
+    """用多个进程生成 level_count 个合格的关卡，按种子顺序写入 output，返回统计信息
+
+    连续 max_rejections 个种子都不合格时停下，这时统计信息里的 complete 是 False。
+    """
+    workers = workers or os.cpu_count() or 1
+    seeds = count(start_seed)
+    accepted = rejected = 0
+    streak = 0  # 连续不合格的种子数
+    reasons = {}
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor, \
+            LevelPackWriter(output) as writer:
+        pending = deque()
+
+        def submit():
+            batch = [next(seeds) for _ in range(chunk_size)]
+            pending.append(executor.submit(build_levels, batch, width, height,
+                                           algorithm, min_path_length))
+
+        # 每个进程保持几批任务在排队，既不让进程闲着，也不会一次提交太多
+        for _ in range(workers * 4):
+            submit()
+
+        while accepted < level_count and streak < max_rejections:
+            for seed, record, reason in pending.popleft().result():
+                if accepted == level_count or streak == max_rejections:
+                    break
+                if record is None:
+                    rejected += 1
+                    streak += 1
+                    reasons[reason] = reasons.get(reason, 0) + 1
+                    continue
+                writer.add_record(record)
+                accepted += 1
+                streak = 0
+            submit()
+
+            elapsed = time.perf_counter() - started
+            print(f"\r已生成 {accepted}/{level_count} 个关卡，"
+                  f"{accepted / elapsed:.0f} 个/秒", end="", file=sys.stderr)
+
+        for future in pending:
+            future.cancel()
+
+    elapsed = time.perf_counter() - started
+    print(file=sys.stderr)
+    return {
+        "complete": accepted == level_count,
+        "accepted": accepted,
+        "rejected": rejected,
+        "reasons": reasons,
+        "seconds": elapsed,
+        "levels_per_second": accepted / elapsed if elapsed > 0 else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并行预生成关卡包")
+    parser.add_argument("output", help="关卡包文件")
+    parser.add_argument("-n", "--count", type=int, default=1000, help="关卡数量")
+    parser.add_argument("--width", type=int, default=25, help="迷宫宽度")
+    parser.add_argument("--height", type=int, default=17, help="迷宫高度")
+    parser.add_argument("--algorithm", default="dfs", choices=sorted(GENERATORS),
+                        help="迷宫生成算法")
+    parser.add_argument("--start-seed", type=int, default=0, help="第一个关卡的随机种子")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="进程数（默认等于 CPU 核数）")
+    parser.add_argument("--chunk-size", type=int, default=64, help="每个任务生成的关卡数")
+    parser.add_argument("--min-path", type=int, default=None,
+                        help="起点到终点的最少步数（默认等于迷宫宽度）")
+    args = parser.parse_args()
+    min_path = args.width if args.min_path is None else args.min_path
+    if args.count < 1:
+        parser.error("关卡数量至少是 1")
+    if args.width < 5 or args.height < 5:
+        parser.error("迷宫至少要 5x5")
+    if min_path >= args.width * args.height:
+        parser.error(f"起点到终点的步数不可能达到 {min_path}（迷宫只有 {args.width * args.height} 个格子）")
+
+    stats = pack_levels(args.output, args.count, args.width, args.height, args.algorithm,
+                        start_seed=args.start_seed, workers=args.workers,
+                        chunk_size=args.chunk_size, min_path_length=min_path)
+
+    if not stats["complete"]:
+        # 关卡数量不够的关卡包不要留下
+        os.remove(args.output)
+        print(f"连续 {MAX_REJECTIONS} 个种子都不合格，只生成了 {stats['accepted']}/{args.count} 个关卡，"
+              f"没有写入 {args.output}：", file=sys.stderr)
+        for reason, number in stats["reasons"].items():
+            print(f"  {reason}: {number}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"完成：{stats['accepted']} 个关卡写入 {args.output}，"
+          f"淘汰 {stats['rejected']} 个，用时 {stats['seconds']:.2f} 秒，"
+          f"{stats['levels_per_second']:.0f} 个/秒")
+    for reason, number in stats["reasons"].items():
+        print(f"  {reason}: {number}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,9 @@ import shutil
 import subprocess
 import sys
 
+# 游戏主程序依赖的模块，需要和 game_test.py 放在一起
+GAME_MODULES = ['maze_gen.py', 'maze_grid.py', 'maze_level.py', 'level_pack.py', 'maze_solver.py', 'distance_field.py', 'corridor_graph.py', 'hpa_star.py', 'path_cache.py', 'route_planner.py', 'entity_store.py', 'particle_budget.py', 'dirty_renderer.py']
+
 def create_package():
     # 创建打包目录
     if not os.path.exists('package'):
@@ -10,6 +13,8 @@ def create_package():
     
     # 复制主游戏文件
     shutil.copy('game_test.py', 'package/game_test.py')
+    for module in GAME_MODULES:
+        shutil.copy(module, os.path.join('package', module))
     
     # 复制资源文件夹
     if os.path.exists('package/resources'):
@@ -29,10 +34,12 @@ def create_package():
         f.write('- 使用方向键移动\n')
         f.write('- 空格键发射火球\n')
         f.write('- 收集钥匙开启门\n')
+        f.write('- H 键显示提示路线\n')
+        f.write('- F2 键切换局部刷新（画面卡时试试）\n')
         f.write('- 躲避怪物\n')
         f.write('- 到达终点获胜\n\n')
         f.write('注意：需要安装Python和以下依赖：\n')
-        f.write('pip install pygame pathfinding\n')
+        f.write('pip install pygame numpy\n')
     
     print('打包完成！文件在 package 目录中。')
 
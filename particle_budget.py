@@ -0,0 +1,64 @@
+import random
+
+MIN_DETAIL = 0.1  # 最低的细节等级，再慢也保留这么多粒子
+TRAIL_DETAIL = 0.5  # 细节等级低于这个值时不再生成拖尾粒子
+DROP = 0.75  # 一帧超时后细节等级乘上的系数
+RECOVER = 0.01  # 一帧很宽裕时细节等级增加的值
+COMFORT = 0.6  # 帧时间低于预算的这个比例才算宽裕
+
+
+class ParticleBudget:
+    """根据帧时间自动调整粒子特效的细节等级（1 是全部特效）
+
+    每帧调用 tick() 告诉它这一帧实际用了多少毫秒（clock.get_rawtime()，不包括 tick 等待的时间）。
+    超过预算时细节等级马上降低：生成的粒子变少、寿命变短，低到一定程度后不再生成拖尾；
+    连续几帧都很宽裕时再慢慢恢复。slow_frames 和 degraded_frames 记录降级的次数。
+    """
+
+    def __init__(self, fps=60):
+        self.frame_budget = 1000 / fps  # 每帧的毫秒数
+        self.detail = 1.0
+        self.frames = 0
+        self.slow_frames = 0  # 超过预算的帧数
+        self.degraded_frames = 0  # 细节等级低于 1 的帧数
+        self.lowest = 1.0
+        self.random = random.Random()
+
+    def tick(self, frame_time):
+        self.frames += 1
+        if frame_time > self.frame_budget:
+            self.slow_frames += 1
+            self.detail = max(MIN_DETAIL, self.detail * DROP)
+            self.lowest = min(self.lowest, self.detail)
+        elif frame_time < self.frame_budget * COMFORT:
+            self.detail = min(1.0, self.detail + RECOVER)
+        if self.detail < 1:
+            self.degraded_frames += 1
+
+    def count(self, count):
+        """按细节等级减少要生成的数量（小数部分按概率取整，所以每次一个的特效也会变少）"""
+        if self.detail >= 1:
+            return count
+        scaled = count * self.detail
+        whole = int(scaled)
+        return whole + (self.random.random() < scaled - whole)
+
+    def lifetime_scale(self):
+        return 0.5 + 0.5 * self.detail
+
+    def trails(self):
+        return self.detail >= TRAIL_DETAIL
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "slow_frames": self.slow_frames,
+            "degraded_frames": self.degraded_frames,
+            "lowest_detail": self.lowest,
+            "detail": self.detail,
+        }
+
+    def report(self):
+        return (f"Particle budget: {self.slow_frames} of {self.frames} frames over "
+                f"{self.frame_budget:.1f} ms, reduced detail for {self.degraded_frames} frames "
+                f"(lowest {self.lowest:.0%})")
@@ -0,0 +1,50 @@
+class PathCache:
+    """放在寻路前面的 LRU 缓存，键是 (查询类型, 起点, 终点, 迷宫版本)
+
+    迷宫改变（拾取钥匙、开门）时把 version 加一，旧版本的结果不会再被命中，
+    之后会被慢慢挤出缓存。hits / misses / evictions 用来决定缓存大小。
+    """
+
+    def __init__(self, pathfinder, size=256):
+        self.pathfinder = pathfinder
+        self.size = size
+        self.version = 0
+        self._entries = {}  # 键 -> 结果（按使用顺序排列）
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key, compute):
+        entries = self._entries
+        if key in entries:
+            self.hits += 1
+            result = entries.pop(key)
+        else:
+            self.misses += 1
+            result = compute()
+            if len(entries) >= self.size:
+                del entries[next(iter(entries))]
+                self.evictions += 1
+        entries[key] = result
+        return result
+
+    def find_path(self, start, goal):
+        """同 pathfinder.find_path()，返回的列表是共享的，不要修改"""
+        start, goal = tuple(start), tuple(goal)
+        return self._lookup(("path", start, goal, self.version),
+                            lambda: self.pathfinder.find_path(start, goal))
+
+    def distance(self, start, goal):
+        start, goal = tuple(start), tuple(goal)
+        return self._lookup(("distance", start, goal, self.version),
+                            lambda: self.pathfinder.distance(start, goal))
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
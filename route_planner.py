@@ -0,0 +1,141 @@
+from heapq import heappop, heappush
+
+import numpy as np
+
+from distance_field import distance_map
+from maze_solver import stop_distances
+
+# 一次规划最多展开的状态数；钥匙和门很多时超过这个数就退回到不开门直接去终点的路线
+MAX_STATES = 20000
+
+
+class RoutePlanner:
+    """拿钥匙、开门再到终点的最短路线（提示和标准时间用）
+
+    规则和 solve_level() 一样：任何一把钥匙都能开任何一扇门，开门后钥匙用掉，不用拿完所有钥匙。
+    钥匙和门都是节点，state 是拿到的钥匙和打开的门的位掩码（第 i 位是 nodes[i]）。
+    创建时用 BFS 求出节点之间不经过其他节点的步数；规划时从当前位置和状态出发，
+    在（节点, state）上用 Dijkstra 只搜索走得到的状态，结果按 (位置, state) 缓存。
+    钥匙和门太多、展开的状态超过 MAX_STATES 时不再求最优，改用不开门直接去终点的路线。
+    """
+
+    def __init__(self, maze, keys, doors, goal, cache_size=64):
+        self.maze = maze
+        self.keys = list(keys)
+        self.doors = list(doors)
+        self.nodes = self.keys + self.doors
+        self.goal = tuple(goal)
+        self.stride = maze.width + 2
+        self.cache_size = cache_size
+        # 钥匙和门都当作可以进入，能不能开门在搜索里判断
+        self._passable = np.pad(maze.cells != 1, 1).reshape(-1).tobytes()
+        cells = [self._index(node) for node in self.nodes + [self.goal]]
+        self._node_of = {index: node for node, index in enumerate(cells)}  # 终点是 len(nodes)
+        self._stops = set(cells[:-1])
+        self._edges = [self._edges_from(node) for node in self.nodes]
+        self._plans = {}  # (位置, state) -> (步数, 路线)（按使用顺序排列）
+        self.fallbacks = 0  # 退回到不开门路线的次数
+
+    def _index(self, pos):
+        return (pos[1] + 1) * self.stride + pos[0] + 1
+
+    def _edges_from(self, source):
+        """source 到相邻节点和终点的 ((节点, 步数), ...)，路上不经过其他钥匙和门"""
+        index = self._index(source)
+        found = stop_distances(self._passable, self._stops, self.stride, index,
+                               set(self._node_of) | {index})
+        return tuple((self._node_of[target], distance) for target, distance in found.items())
+
+    def current_state(self):
+        """按迷宫当前的状态（拿走的钥匙和打开的门都变成了通道）算出 state"""
+        state = 0
+        for i, (x, y) in enumerate(self.nodes):
+            if self.maze.get(x, y) == 0:
+                state |= 1 << i
+        return state
+
+    def _held(self, state):
+        """状态 state 下手里的钥匙数"""
+        keys = state & ((1 << len(self.keys)) - 1)
+        return bin(keys).count("1") - bin(state >> len(self.keys)).count("1")
+
+    def _search(self, position, state):
+        """从 position、state 出发到终点的 (步数, [钥匙或门, ..., 终点])，走不到时是 (None, [])"""
+        position = tuple(position)
+        if position == self.goal:
+            return 0, [self.goal]
+        goal = len(self.nodes)
+        first_door = len(self.keys)
+        start = -1  # 起点不是节点
+        start_edges = self._edges_from(position)
+        best = {(start, state): 0}
+        parent = {}
+        heap = [(0, start, state)]
+        expanded = 0
+        while heap:
+            cost, node, current = heappop(heap)
+            if node == goal:
+                return cost, self._order((node, current), parent)
+            if cost > best[node, current]:
+                continue
+            expanded += 1
+            if expanded > MAX_STATES:
+                return self._fallback(position)
+            held = self._held(current)
+            for target, distance in start_edges if node == start else self._edges[node]:
+                new_state = current
+                if target != goal:
+                    bit = 1 << target
+                    if target >= first_door and not current & bit and held <= 0:
+                        continue  # 没有钥匙开不了门
+                    new_state = current | bit
+                new_cost = cost + distance
+                if new_cost < best.get((target, new_state), new_cost + 1):
+                    best[target, new_state] = new_cost
+                    parent[target, new_state] = (node, current)
+                    heappush(heap, (new_cost, target, new_state))
+        return None, []
+
+    def _order(self, last, parent):
+        """沿父节点往回，取出第一次到达的钥匙和门（路过已经拿过、开过的节点不算）"""
+        order = [self.goal]
+        node, state = last
+        while (node, state) in parent:
+            previous = parent[node, state]
+            if previous[1] != state:
+                order.append(self.nodes[node])
+            node, state = previous
+        order.reverse()
+        return order
+
+    def _fallback(self, position):
+        """不开门直接去终点（钥匙可以路过）的步数，不一定是最短的"""
+        self.fallbacks += 1
+        steps = int(distance_map(self.maze, position)[self.goal[1], self.goal[0]])
+        return (steps, [self.goal]) if steps >= 0 else (None, [])
+
+    def _plan(self, position, state):
+        if state is None:
+            state = self.current_state()
+        key = (tuple(position), state)
+        result = self._plans.pop(key, None)
+        if result is None:
+            result = self._search(position, state)
+            if len(self._plans) >= self.cache_size:
+                del self._plans[next(iter(self._plans))]
+        self._plans[key] = result
+        return result
+
+    def plan(self, position, state=None):
+        """从 position 出发到终点的 (最少步数, 下一个目标)，state 默认按迷宫当前的状态
+
+        下一个目标是下一把要拿的钥匙或下一扇要开的门，直接去终点最快时是终点；走不通时返回 (None, None)。
+        """
+        steps, order = self._plan(position, state)
+        if steps is None:
+            return None, None
+        return steps, order[0]
+
+    def route(self, position, state=None):
+        """完整的路线 [钥匙或门, ..., 终点]，走不通时返回空列表（返回的列表是共享的，不要修改）"""
+        return self._plan(position, state)[1]
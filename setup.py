@@ -4,7 +4,7 @@ import os
 
 # 依赖项
 build_exe_options = {
-    "packages": ["pygame", "pathfinding"],
+    "packages": ["pygame", "numpy"],
     "include_files": [("resources", "resources")],
     "excludes": []
 }
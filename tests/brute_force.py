@@ -0,0 +1,75 @@
+from collections import deque
+
+STEPS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+
+def grid_distances(maze, source, blocking=(1, 3)):
+    """最普通的逐格 BFS：{格子: 从 source 出发的步数}，用来核对各种寻路结构"""
+    distance = {tuple(source): 0}
+    queue = deque([tuple(source)])
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in STEPS:
+            neighbor = (x + dx, y + dy)
+            if (maze.in_bounds(*neighbor) and maze.get(*neighbor) not in blocking
+                    and neighbor not in distance):
+                distance[neighbor] = distance[x, y] + 1
+                queue.append(neighbor)
+    return distance
+
+
+def solve_by_states(maze, start, end, keys_held=0):
+    """直接在格子上 BFS（位置, 拿到的钥匙, 打开的门）的最少步数，走不到时返回 None
+
+    规则和游戏一样：走到钥匙上就拿到，任何钥匙都能开任何门，开门后钥匙用掉。
+    """
+    keys = {}
+    doors = {}
+    for y in range(maze.height):
+        for x in range(maze.width):
+            if maze.get(x, y) == 2:
+                keys[x, y] = 1 << len(keys)
+            elif maze.get(x, y) == 3:
+                doors[x, y] = 1 << len(doors)
+    state = (tuple(start), 0, 0)
+    steps = {state: 0}
+    queue = deque([state])
+    while queue:
+        state = queue.popleft()
+        (x, y), collected, opened = state
+        if (x, y) == tuple(end):
+            return steps[state]
+        held = keys_held + bin(collected).count("1") - bin(opened).count("1")
+        for dx, dy in STEPS:
+            position = (x + dx, y + dy)
+            if not maze.in_bounds(*position) or maze.get(*position) == 1:
+                continue
+            new_collected, new_opened = collected | keys.get(position, 0), opened
+            if position in doors and not opened & doors[position]:
+                if held <= 0:
+                    continue
+                new_opened = opened | doors[position]
+            new_state = (position, new_collected, new_opened)
+            if new_state not in steps:
+                steps[new_state] = steps[state] + 1
+                queue.append(new_state)
+    return None
+
+
+def check_pathfinder(pathfinder, maze, rng, sources=6, targets=20):
+    """随机取一些格子对，核对 pathfinder 的 distance() 和 find_path() 与逐格 BFS 的结果"""
+    cells = [(x, y) for y in range(maze.height) for x in range(maze.width) if maze.get(x, y) not in (1, 3)]
+    for source in rng.sample(cells, min(sources, len(cells))):
+        distance = grid_distances(maze, source)
+        for target in rng.sample(cells, min(targets, len(cells))):
+            expected = distance.get(target)
+            assert pathfinder.distance(source, target) == expected, (source, target)
+            path = pathfinder.find_path(source, target)
+            if expected is None:
+                assert path == [], (source, target)
+                continue
+            assert path[0] == source and path[-1] == target, (source, target)
+            assert len(path) == expected + 1, (source, target)
+            for (ax, ay), (bx, by) in zip(path, path[1:]):
+                assert abs(ax - bx) + abs(ay - by) == 1, (source, target)
+            assert all(maze.get(*cell) not in (1, 3) for cell in path), (source, target)
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from brute_force import check_pathfinder
+from corridor_graph import CorridorGraph
+from maze_grid import MazeGrid
+from maze_level import generate_level
+
+
+def inner_walls(maze):
+    return [(x, y) for y in range(1, maze.height - 1) for x in range(1, maze.width - 1)
+            if maze.get(x, y) == 1]
+
+
+@pytest.mark.parametrize("algorithm", ["dfs", "prim", "binary_tree"])
+def test_matches_bfs(algorithm):
+    for seed in range(10):
+        maze, start_pos, end_pos, doors, keys = generate_level(seed, 31, 21, algorithm)
+        check_pathfinder(CorridorGraph(maze, (end_pos,)), maze, random.Random(seed))
+
+
+def test_open_doors_one_by_one():
+    for seed in range(10):
+        maze, start_pos, end_pos, doors, keys = generate_level(seed, 25, 17)
+        graph = CorridorGraph(maze, (end_pos,))
+        rng = random.Random(seed)
+        for x, y in doors:
+            maze.set(x, y, 0)
+            graph.open_cell(x, y)
+            check_pathfinder(graph, maze, rng, sources=3)
+            # 开过的门再开一次不会出错
+            graph.open_cell(x, y)
+
+
+def test_knock_down_walls():
+    for seed in range(10):
+        maze, start_pos, end_pos, doors, keys = generate_level(seed, 25, 17)
+        graph = CorridorGraph(maze, (end_pos,))
+        rng = random.Random(seed)
+        # 打通墙会让走廊中间多出岔路，还会在迷宫里形成环
+        for x, y in rng.sample(inner_walls(maze), 30):
+            maze.set(x, y, 0)
+            graph.open_cell(x, y)
+        check_pathfinder(graph, maze, rng, sources=10)
+
+
+def test_ring_corridor_without_junctions():
+    maze = MazeGrid.from_rows([
+        [1, 1, 1, 1, 1, 1],
+        [1, 0, 0, 0, 0, 1],
+        [1, 0, 1, 1, 0, 1],
+        [1, 0, 0, 0, 0, 1],
+        [1, 1, 1, 1, 1, 1],
+    ])
+    graph = CorridorGraph(maze)
+    check_pathfinder(graph, maze, random.Random(0), sources=10, targets=10)
+    assert graph.distance((1, 1), (4, 3)) == 5
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from brute_force import check_pathfinder
+from hpa_star import HierarchicalPathfinder
+from maze_level import generate_level
+
+
+# 游戏里只有超过 HPA_MIN_CELLS 的迷宫才用分层寻路；这里用很小的区块，让小迷宫也有很多区块边界
+@pytest.mark.parametrize("cluster_size", [3, 4, 7])
+def test_matches_bfs(cluster_size):
+    for seed in range(8):
+        maze, start_pos, end_pos, doors, keys = generate_level(seed, 31, 23)
+        pathfinder = HierarchicalPathfinder(maze, cluster_size)
+        check_pathfinder(pathfinder, maze, random.Random(seed))
+
+
+@pytest.mark.parametrize("cluster_size", [3, 4])
+def test_set_walkable_both_ways(cluster_size):
+    for seed in range(8):
+        maze, start_pos, end_pos, doors, keys = generate_level(seed, 25, 17)
+        pathfinder = HierarchicalPathfinder(maze, cluster_size)
+        rng = random.Random(seed)
+        check_pathfinder(pathfinder, maze, rng, sources=3)  # 先查询一次，让区块缓存建立起来
+        for x, y in doors:
+            maze.set(x, y, 0)
+            pathfinder.open_cell(x, y)
+        check_pathfinder(pathfinder, maze, rng, sources=3)
+
+        walls = [(x, y) for y in range(1, maze.height - 1) for x in range(1, maze.width - 1)
+                 if maze.get(x, y) == 1]
+        opened = rng.sample(walls, 20)
+        for x, y in opened:
+            maze.set(x, y, 0)
+            pathfinder.set_walkable(x, y, True)
+        check_pathfinder(pathfinder, maze, rng, sources=3)
+
+        # 再把一部分打通的墙和一些通道堵上
+        floor = [(x, y) for y in range(maze.height) for x in range(maze.width) if maze.get(x, y) == 0]
+        for x, y in opened[:10] + rng.sample(floor, 10):
+            maze.set(x, y, 1)
+            pathfinder.set_walkable(x, y, False)
+        check_pathfinder(pathfinder, maze, rng, sources=3)
@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from brute_force import grid_distances
+from maze_gen import PATH, WALL, MazeWindow, carve_eller
+from maze_grid import MazeGrid
+
+
+def scroll(window):
+    """让玩家从第 0 行一直往下走，记下每一行刚进入窗口时的内容"""
+    rows = {}
+    y = 0
+    while True:
+        more = window.follow(y)
+        assert len(window.rows) <= window.size
+        assert y in window and window.bottom - window.top == len(window.rows)
+        for row in range(window.top, window.bottom):
+            rows.setdefault(row, bytes(window.row(row)))
+        if window.top > 0:
+            with pytest.raises(IndexError):
+                window.row(window.top - 1)
+        if not more and y == window.bottom - 1:
+            return rows
+        y += 1
+
+
+def rooms(maze, height):
+    return [(x, y) for y in range(1, height, 2) for x in range(1, maze.width, 2) if maze.get(x, y) == PATH]
+
+
+@pytest.mark.parametrize("width, height, size", [(25, 17, 6), (41, 61, 9), (20, 30, 4)])
+def test_window_streams_a_connected_maze(width, height, size):
+    for seed in range(5):
+        window = MazeWindow(width, size, random.Random(seed), height)
+        rows = scroll(window)
+        assert sorted(rows) == list(range(height))
+        cells = b"".join(rows[y] for y in range(height))
+        # 和一次生成整张迷宫的结果一样
+        assert cells == bytes(carve_eller(width, height, random.Random(seed)))
+
+        maze = MazeGrid(cells, width, height)
+        reached = grid_distances(maze, (1, 1))
+        floor = [(x, y) for y in range(height) for x in range(width) if maze.get(x, y) == PATH]
+        assert all(cell in reached for cell in floor)
+        # 完美迷宫：通道组成一棵树，相邻的通道对数 = 通道数 - 1
+        links = sum(maze.get(x + 1, y) == PATH for x, y in floor if x + 1 < width) + \
+            sum(maze.get(x, y + 1) == PATH for x, y in floor if y + 1 < height)
+        assert links == len(floor) - 1
+
+
+def test_endless_window_keeps_rows_connected():
+    width, size, height = 31, 8, 400
+    window = MazeWindow(width, size, random.Random(1))
+    rows = {}
+    for y in range(height):
+        assert window.follow(y)
+        for row in range(window.top, window.bottom):
+            rows.setdefault(row, bytes(window.row(row)))
+    assert all(len(row) == width and row[0] == row[-1] == WALL for row in rows.values())
+
+    # 没结束的迷宫里，同一行的房间可能要在下面很多行之后才连起来，所以只检查离底部足够远的行
+    total = max(rows) + 1
+    maze = MazeGrid(b"".join(rows[y] for y in range(total)), width, total)
+    reached = grid_distances(maze, (1, 1))
+    assert all(cell in reached for cell in rooms(maze, total - 60))
@@ -0,0 +1,50 @@
+import pytest
+
+from brute_force import solve_by_states
+from maze_grid import MazeGrid
+from maze_level import generate_level
+from maze_solver import level_par, solve_level
+
+
+@pytest.mark.parametrize("size", [(15, 11), (21, 15)])
+def test_solve_level_matches_state_bfs(size):
+    for seed in range(40):
+        maze, start_pos, end_pos, doors, keys = generate_level(seed, *size)
+        assert solve_level(maze, start_pos, end_pos) == solve_by_states(maze, start_pos, end_pos), seed
+
+
+def test_solve_level_from_random_cells_with_keys_held():
+    for seed in range(20):
+        maze, start_pos, end_pos, doors, keys = generate_level(seed, 15, 11)
+        floor = [(x, y) for y in range(maze.height) for x in range(maze.width) if maze.get(x, y) == 0]
+        for start in floor[::7]:
+            for keys_held in (0, 1):
+                assert solve_level(maze, start, end_pos, keys_held) == \
+                    solve_by_states(maze, start, end_pos, keys_held), (seed, start, keys_held)
+
+
+def test_door_needs_a_key():
+    maze = MazeGrid.from_rows([
+        [1, 1, 1, 1, 1, 1, 1],
+        [1, 0, 0, 3, 0, 0, 1],
+        [1, 1, 1, 1, 1, 1, 1],
+    ])
+    assert solve_level(maze, (1, 1), (5, 1)) is None
+    assert solve_level(maze, (1, 1), (5, 1), keys_held=1) == 4
+    maze.set(2, 1, 2)  # 门前放一把钥匙
+    assert solve_level(maze, (1, 1), (5, 1)) == 4
+
+
+def test_detour_for_a_key_beats_the_long_way_round():
+    maze = MazeGrid.from_rows([
+        [1, 1, 1, 1, 1, 1, 1, 1, 1],
+        [1, 0, 2, 0, 3, 0, 0, 0, 1],
+        [1, 1, 1, 0, 1, 1, 1, 0, 1],
+        [1, 1, 1, 0, 0, 0, 0, 0, 1],
+        [1, 1, 1, 1, 1, 1, 1, 1, 1],
+    ])
+    # 回头拿钥匙再穿门（6 步）比从下面绕过去（8 步）近
+    assert solve_level(maze, (3, 1), (7, 1)) == solve_by_states(maze, (3, 1), (7, 1)) == 6
+    assert level_par((maze, (3, 1), (7, 1), [(4, 1)], [(2, 1)])) == 6
+    maze.set(2, 1, 0)
+    assert solve_level(maze, (3, 1), (7, 1)) == 8
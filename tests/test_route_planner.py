@@ -0,0 +1,117 @@
+import random
+
+import pytest
+
+import route_planner
+from brute_force import STEPS, grid_distances, solve_by_states
+from maze_gen import generate_maze
+from maze_grid import CandidateIndex, MazeGrid
+from maze_level import generate_level
+from maze_solver import solve_level
+from route_planner import RoutePlanner
+
+
+def leg_length(maze, start, target):
+    """按迷宫当前状态从 start 走到 target 的步数，target 是没开的门时走进门里"""
+    distance = grid_distances(maze, start)
+    if maze.get(*target) != 3:
+        return distance[target]
+    x, y = target
+    return min(distance[x + dx, y + dy] for dx, dy in STEPS if (x + dx, y + dy) in distance) + 1
+
+
+@pytest.mark.parametrize("size", [(15, 11), (21, 15)])
+def test_plan_matches_state_bfs(size):
+    for seed in range(40):
+        maze, start_pos, end_pos, doors, keys = generate_level(seed, *size)
+        steps, target = RoutePlanner(maze, keys, doors, end_pos).plan(start_pos)
+        assert steps == solve_by_states(maze, start_pos, end_pos), seed
+
+
+def test_following_the_route_takes_par_steps():
+    for seed in range(60):
+        maze, start_pos, end_pos, doors, keys = generate_level(seed, 15, 11)
+        planner = RoutePlanner(maze, keys, doors, end_pos)
+        par, _ = planner.plan(start_pos)
+        position, walked, held = start_pos, 0, 0
+        for target in planner.route(start_pos):
+            walked += leg_length(maze, position, target)
+            # 拿走的钥匙和打开的门变成通道，和游戏里一样
+            if maze.get(*target) == 2:
+                held += 1
+            elif maze.get(*target) == 3:
+                assert held > 0, seed
+                held -= 1
+            maze.set(*target, 0)
+            position = target
+            if target != end_pos:
+                # 走到一半重新规划，剩下的步数和直接搜索的一样
+                remaining, _ = planner.plan(position)
+                assert remaining == solve_by_states(maze, position, end_pos, held), seed
+                assert walked + remaining == par, seed
+        assert position == end_pos and walked == par, seed
+
+
+def test_goal_without_collecting_every_key():
+    maze = MazeGrid.from_rows([
+        [1, 1, 1, 1, 1, 1, 1, 1],
+        [1, 2, 0, 0, 0, 0, 2, 1],
+        [1, 1, 1, 1, 1, 1, 1, 1],
+    ])
+    planner = RoutePlanner(maze, [(1, 1), (6, 1)], [], (4, 1))
+    assert planner.plan((3, 1)) == (1, (4, 1))
+    assert planner.route((3, 1)) == [(4, 1)]
+
+
+def test_route_opens_a_door_as_a_shortcut():
+    maze = MazeGrid.from_rows([
+        [1, 1, 1, 1, 1, 1, 1, 1, 1],
+        [1, 0, 2, 0, 3, 0, 0, 0, 1],
+        [1, 1, 1, 0, 1, 1, 1, 0, 1],
+        [1, 1, 1, 0, 0, 0, 0, 0, 1],
+        [1, 1, 1, 1, 1, 1, 1, 1, 1],
+    ])
+    planner = RoutePlanner(maze, [(2, 1)], [(4, 1)], (7, 1))
+    assert planner.plan((3, 1)) == (6, (2, 1))
+    assert planner.route((3, 1)) == [(2, 1), (4, 1), (7, 1)]
+    # 钥匙拿到以后下一个目标是门
+    maze.set(2, 1, 0)
+    assert planner.plan((2, 1)) == (5, (4, 1))
+
+
+def level_with(seed, key_count, door_count, width=61, height=41):
+    """比游戏里多得多的钥匙和门"""
+    rng = random.Random(seed)
+    maze = MazeGrid(generate_maze('dfs', width, height, rng), width, height)
+    index = CandidateIndex(maze)
+    start_pos = index.floor.choice(rng)
+    index.reserve(start_pos)
+    end_pos = index.floor.choice(rng)
+    index.reserve(end_pos)
+    doors = index.doors.sample(rng, door_count)
+    for x, y in doors:
+        index.place(x, y, 3)
+    keys = index.floor.sample(rng, key_count)
+    for x, y in keys:
+        index.place(x, y, 2)
+    return maze, start_pos, end_pos, doors, keys
+
+
+def test_many_keys_and_doors():
+    for seed in range(3):
+        maze, start_pos, end_pos, doors, keys = level_with(seed, 16, 16)
+        planner = RoutePlanner(maze, keys, doors, end_pos)
+        steps, target = planner.plan(start_pos)
+        assert steps == solve_level(maze, start_pos, end_pos), seed
+        assert planner.fallbacks == 0
+
+
+def test_falls_back_when_the_search_is_too_big(monkeypatch):
+    monkeypatch.setattr(route_planner, "MAX_STATES", 5)
+    maze, start_pos, end_pos, doors, keys = level_with(1, 16, 16)
+    planner = RoutePlanner(maze, keys, doors, end_pos)
+    steps, target = planner.plan(start_pos)
+    assert planner.fallbacks == 1
+    # 退回到不开门直接去终点的路线
+    assert target == end_pos
+    assert steps == grid_distances(maze, start_pos).get(end_pos)